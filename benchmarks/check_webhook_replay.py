@@ -0,0 +1,103 @@
+import os
+import sys
+import asyncio
+import tempfile
+from mock_server import MockApiServer, MockApiState
+
+# Replays benchmarks/fixtures/webhook_events.ndjson (deliveries recorded with
+# webhook_receiver.py --record) against the local mock API, after seeding the
+# inventory with a full generate_csv2 audit, and checks the SOC rows that
+# come out. Nothing leaves the machine and nothing is written under reports/.
+#
+#   python benchmarks/check_webhook_replay.py
+
+# Configuration Section
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.abspath(os.path.join(BENCH_DIR, "..", "scripts"))
+FIXTURE = os.path.join(BENCH_DIR, "fixtures", "webhook_events.ndjson")
+BENCH_ORG = "bench-org"
+
+# Mock repos repo-00000..00029: every 3rd is SOC, every 2nd is followed by Codacy
+MOCK_REPOS = 30
+
+# The fixture holds:
+#   push to repo-00003                              -> row kept, no lookup
+#   Compliance=SOC set on repo-00001                -> row added after one Codacy lookup ("Added", so "no")
+#   Compliance=none set on repo-00006               -> row removed
+#   repo-00009 renamed to payments-api              -> row renamed in place
+#   repo-00012 transferred to another org           -> row removed
+#   repo-00015 deleted                              -> row removed
+#   a star event and a push to an unaudited org     -> ignored
+EXPECTED_ROWS = {
+    "repo-00000": "yes",
+    "repo-00001": "no",
+    "repo-00003": "no",
+    "payments-api": "no",
+    "repo-00018": "yes",
+    "repo-00021": "no",
+    "repo-00024": "yes",
+    "repo-00027": "no",
+}
+EXPECTED_APPLIED = 6
+EXPECTED_IGNORED = 2
+EXPECTED_REQUESTS = 1
+
+# --------------------- Check ----------------------------------
+
+async def seed_inventory(generate_csv2):
+    from http_client import HttpClient
+
+    async with HttpClient() as client:
+        soc_rows, failed_orgs = await generate_csv2.collect_orgs_soc_rows(client, [BENCH_ORG])
+    if failed_orgs:
+        raise Exception(f"🚨 Seeding the inventory failed for: {', '.join(failed_orgs)}")
+    return soc_rows
+
+def main():
+    with tempfile.TemporaryDirectory() as work_dir, MockApiServer(MockApiState(repos=MOCK_REPOS)) as server:
+        os.environ.update({
+            **server.env(),
+            "TOKEN_GITHUB": "bench-token",
+            "ORG_GITHUB": BENCH_ORG,
+            "CODACY_API_TOKEN": "bench-token",
+            "CODACY_ORG_NAME": BENCH_ORG,
+            "HTTP_CACHE_PATH": os.path.join(work_dir, "http_cache.sqlite"),
+            "SNAPSHOT_DB_PATH": os.path.join(work_dir, "snapshots.sqlite"),
+            "INVENTORY_DIR": work_dir,
+            "RUN_PROFILE_DIR": work_dir,
+        })
+        sys.path.insert(0, SCRIPTS_DIR)
+        import generate_csv2
+        import webhook_receiver
+
+        # The re-rendered rows are checked here instead of being written under reports/
+        rendered = []
+        generate_csv2.export_to_csv = rendered.append
+
+        seeded = asyncio.run(seed_inventory(generate_csv2))
+        print(f"🌱 Seeded the inventory with {len(seeded)} SOC repos")
+
+        requests_before = server.state.requests
+        state = asyncio.run(webhook_receiver.replay(FIXTURE))
+        requests = server.state.requests - requests_before
+
+    rows = {row[0]: row[3] for row in state.soc_rows()}
+    problems = []
+    if rows != EXPECTED_ROWS:
+        problems.append(f"SOC rows {rows}, expected {EXPECTED_ROWS}")
+    if (state.applied, state.ignored, state.failed) != (EXPECTED_APPLIED, EXPECTED_IGNORED, 0):
+        problems.append(
+            f"{state.applied} applied / {state.ignored} ignored / {state.failed} failed, "
+            f"expected {EXPECTED_APPLIED} / {EXPECTED_IGNORED} / 0"
+        )
+    if requests != EXPECTED_REQUESTS:
+        problems.append(f"{requests} API requests, expected {EXPECTED_REQUESTS}")
+    if len(rendered) != 1 or {row[0] for row in rendered[0]} != set(EXPECTED_ROWS):
+        problems.append("the replay did not re-render the SOC report once with the expected rows")
+    if problems:
+        raise Exception("🚨 Webhook replay check failed:\n  " + "\n  ".join(problems))
+    print(f"✅ Webhook replay matches the expected inventory ({len(rows)} SOC repos, {requests} API request)")
+
+if __name__ == "__main__":
+    main()
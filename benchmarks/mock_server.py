@@ -0,0 +1,353 @@
+import json
+import time
+import base64
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Local stand-in for the GitHub REST/GraphQL and Codacy v3 APIs used by
+# the scripts. Point them at it with:
+#   GITHUB_API_URL=<base>/github
+#   CODACY_API_URL=<base>/codacy/v3
+
+# Configuration Section
+
+DEFAULT_REPOS = 1000
+DEFAULT_README_KB = 4
+
+# Every SOC_EVERY-th repo has Compliance=SOC; every CODACY_EVERY-th is on Codacy
+SOC_EVERY = 3
+CODACY_EVERY = 2
+
+# Every DETAILS_MISSING_EVERY-th Codacy search result lacks the detail metrics
+DETAILS_MISSING_EVERY = 10
+
+GRADES = "ABCDF"
+
+# Helper Functions
+
+def repo_name(i):
+    return f"repo-{i:05d}"
+
+def repo_index(name):
+    try:
+        return int(name.rsplit("-", 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+class MockApiState:
+    """Org shape and fault injection settings, plus request counters."""
+
+    def __init__(self, repos=DEFAULT_REPOS, latency_ms=0.0, error_rate=0.0, throttle_rate=0.0,
+                 readme_kb=DEFAULT_README_KB, rate_limit=1_000_000, rate_window=60.0, seed=1):
+        self.repos = repos
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.readme_kb = readme_kb
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.injected = 0
+        self._window_start = time.time()
+        self._window_used = 0
+
+    def take_budget(self):
+        """Count one request against the rate limit; returns (remaining, reset_epoch)."""
+        with self.lock:
+            self.requests += 1
+            now = time.time()
+            if now - self._window_start >= self.rate_window:
+                self._window_start = now
+                self._window_used = 0
+            self._window_used += 1
+            remaining = max(0, self.rate_limit - self._window_used)
+            return remaining, int(self._window_start + self.rate_window)
+
+    def inject_fault(self):
+        """Return 429, 502 or None for this request, according to the configured rates."""
+        with self.lock:
+            roll = self.random.random()
+            if roll < self.throttle_rate:
+                self.injected += 1
+                return 429
+            if roll < self.throttle_rate + self.error_rate:
+                self.injected += 1
+                return 502
+        return None
+
+    def readme(self, i):
+        filler = ("lorem ipsum dolor sit amet " * 40 + "\n") * max(1, self.readme_kb)
+        badge = "[![Codacy Badge](https://app.codacy.com/project/badge/Grade/x)]\n" if i % 2 else ""
+        # Badge at the end, so a streaming scan has to read the whole file
+        return (f"# {repo_name(i)}\n" + filler[: self.readme_kb * 1024] + badge).encode()
+
+# --------------------- Request Handling ----------------------------------
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None  # bound per server by MockApiServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, status, payload, headers=None):
+        self._send(status, json.dumps(payload).encode(), headers=headers)
+
+    def _handle(self, method):
+        state = self.state
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if state.latency:
+            time.sleep(state.latency)
+
+        remaining, reset = state.take_budget()
+        rate_headers = {
+            "X-RateLimit-Limit": str(state.rate_limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(reset),
+        }
+        fault = state.inject_fault()
+        if fault == 429:
+            return self._json(429, {"message": "rate limit"}, {**rate_headers, "Retry-After": "0"})
+        if fault == 502:
+            return self._json(502, {"message": "bad gateway"}, rate_headers)
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = [part for part in url.path.split("/") if part]
+        if parts[:1] == ["github"]:
+            return self._github(method, parts[1:], query, body, rate_headers)
+        if parts[:2] == ["codacy", "v3"]:
+            return self._codacy_v3(method, parts[2:], body)
+        return self._json(404, {"message": "Not Found"})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    # --- GitHub ---
+
+    def _page(self, query):
+        page = int(query.get("page", ["1"])[0])
+        per_page = int(query.get("per_page", ["30"])[0])
+        last = max(1, -(-self.state.repos // per_page))
+        start = (page - 1) * per_page
+        return range(start, min(self.state.repos, start + per_page)), page, per_page, last
+
+    def _link(self, path, page, per_page, last):
+        if page >= last:
+            return {}
+        base = f"http://{self.headers['Host']}{path}?per_page={per_page}"
+        return {"Link": f'<{base}&page={page + 1}>; rel="next", <{base}&page={last}>; rel="last"'}
+
+    def _repo(self, org, i):
+        return {
+            "id": 100000 + i,
+            "name": repo_name(i),
+            "full_name": f"{org}/{repo_name(i)}",
+            "owner": {"login": org, "id": 1, "type": "Organization"},
+            "html_url": f"https://github.com/{org}/{repo_name(i)}",
+            "default_branch": "main",
+            "private": True,
+            "pushed_at": "2024-01-01T00:00:00Z",
+            "updated_at": "2024-01-01T00:00:00Z",
+            "permissions": {"admin": False, "push": True, "pull": True},
+            "license": None,
+        }
+
+    def _properties(self, i):
+        value = "SOC" if i % SOC_EVERY == 0 else "none"
+        return [{"property_name": "Compliance", "value": value}]
+
+    def _github(self, method, parts, query, body, rate_headers):
+        path = "/github/" + "/".join(parts)
+        if method == "POST" and parts == ["graphql"]:
+            return self._graphql(body, rate_headers)
+
+        if len(parts) == 3 and parts[0] == "orgs" and parts[2] == "repos":
+            indexes, page, per_page, last = self._page(query)
+            items = [self._repo(parts[1], i) for i in indexes]
+            return self._json(200, items, {**rate_headers, **self._link(path, page, per_page, last)})
+
+        if len(parts) == 4 and parts[0] == "orgs" and parts[2:] == ["properties", "values"]:
+            indexes, page, per_page, last = self._page(query)
+            items = [
+                {"repository_full_name": f"{parts[1]}/{repo_name(i)}", "properties": self._properties(i)}
+                for i in indexes
+            ]
+            return self._json(200, items, {**rate_headers, **self._link(path, page, per_page, last)})
+
+        if len(parts) >= 4 and parts[0] == "repos":
+            i = repo_index(parts[2])
+            if i is None or i >= self.state.repos:
+                return self._json(404, {"message": "Not Found"}, rate_headers)
+            if parts[3:] == ["properties", "values"]:
+                return self._json(200, self._properties(i), rate_headers)
+            if parts[3:] == ["readme"]:
+                etag = f'"readme-{i}"'
+                if self.headers.get("If-None-Match") == etag:
+                    return self._send(304, headers={**rate_headers, "ETag": etag})
+                readme = self.state.readme(i)
+                if self.headers.get("Accept") == "application/vnd.github.raw":
+                    return self._send(200, readme, "text/plain", {**rate_headers, "ETag": etag})
+                return self._json(200, {"content": base64.b64encode(readme).decode()}, {**rate_headers, "ETag": etag})
+        return self._json(404, {"message": "Not Found"}, rate_headers)
+
+    def _graphql(self, body, rate_headers):
+        variables = json.loads(body)["variables"]
+        start = int(variables.get("after") or 0)
+        end = min(self.state.repos, start + int(variables["first"]))
+        org = variables["org"]
+        nodes = [
+            {
+                "name": repo_name(i),
+                "databaseId": 100000 + i,
+                "url": f"https://github.com/{org}/{repo_name(i)}",
+                "owner": {"login": org},
+                "defaultBranchRef": {"name": "main"},
+                "readme": {"text": self.state.readme(i).decode()},
+                "readmeLower": None,
+            }
+            for i in range(start, end)
+        ]
+        repositories = {
+            "pageInfo": {"hasNextPage": end < self.state.repos, "endCursor": str(end)},
+            "nodes": nodes,
+        }
+        return self._json(200, {"data": {"organization": {"repositories": repositories}}}, rate_headers)
+
+    # --- Codacy ---
+
+    def _codacy_search_item(self, org, i):
+        # Codacy omits the detail metrics for repos it has not analysed fully
+        item = {
+            "repository": self._codacy_repository(org, i),
+            "gradeLetter": GRADES[i % len(GRADES)],
+            "coverage": {"coveragePercentage": (i * 13) % 100},
+            "lastAnalysedCommit": {"sha": f"{i:040x}"},
+        }
+        if i % DETAILS_MISSING_EVERY != DETAILS_MISSING_EVERY - 1:
+            item.update({
+                "issuesPercentage": (i * 7) % 100,
+                "complexFilesPercentage": (i * 3) % 100,
+                "duplicationPercentage": (i * 11) % 100,
+            })
+        return item
+
+    def _codacy_repository(self, org, i):
+        # Every repo is known to Codacy; only every CODACY_EVERY-th is followed (integrated)
+        return {
+            "name": repo_name(i),
+            "owner": org,
+            "provider": "gh",
+            "addedState": "Following" if i % CODACY_EVERY == 0 else "Added",
+            "codingStandardName": "Default",
+            "remoteIdentifier": str(100000 + i),
+        }
+
+    def _codacy_v3(self, method, parts, body):
+        # /organizations/gh/{owner}/repositories/{repo}
+        if method == "GET" and len(parts) == 5 and parts[0] == "organizations" and parts[3] == "repositories":
+            i = repo_index(parts[4])
+            if i is None or i >= self.state.repos:
+                return self._json(404, {"message": "Not Found"})
+            return self._json(200, {"data": self._codacy_repository(parts[2], i)})
+
+        # /analysis/organizations/gh/{org}/repositories/{repo}
+        if method == "GET" and len(parts) == 6 and parts[:2] == ["analysis", "organizations"] and parts[4] == "repositories":
+            i = repo_index(parts[5])
+            if i is None or i >= self.state.repos:
+                return self._json(404, {"message": "Not Found"})
+            return self._json(200, {"data": {
+                "repository": {"name": parts[5], "owner": parts[3], "provider": "gh"},
+                "gradeLetter": GRADES[i % len(GRADES)],
+                "issuesPercentage": (i * 7) % 100,
+                "complexFilesPercentage": (i * 3) % 100,
+                "duplicationPercentage": (i * 11) % 100,
+                "coverage": {"coveragePercentage": (i * 13) % 100},
+                "lastAnalysedCommit": {"sha": f"{i:040x}"},
+            }})
+
+        # /search/analysis/organizations/gh/{org}/repositories
+        if method == "POST" and parts[:3] == ["search", "analysis", "organizations"] and parts[-1] == "repositories":
+            org = parts[4]
+            payload = json.loads(body or b"{}")
+            start = int(payload.get("cursor") or 0)
+            end = min(self.state.repos, start + int(payload.get("limit", 100)))
+            data = [self._codacy_search_item(org, i) for i in range(start, end)]
+            pagination = {"cursor": str(end)} if end < self.state.repos else {}
+            return self._json(200, {"data": data, "pagination": pagination})
+        return self._json(404, {"message": "Not Found"})
+
+# --------------------- Server ----------------------------------
+
+class MockApiServer:
+    """Run the mock API on a free local port in a background thread."""
+
+    def __init__(self, state, host="127.0.0.1", port=0):
+        handler = type("BoundMockApiHandler", (MockApiHandler,), {"state": state})
+        self.state = state
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self):
+        """Environment variables pointing the scripts at this server."""
+        return {
+            "GITHUB_API_URL": f"{self.base_url}/github",
+            "CODACY_API_URL": f"{self.base_url}/codacy/v3",
+        }
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a mock GitHub/Codacy API for local runs.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--repos", type=int, default=DEFAULT_REPOS)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 502")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--readme-kb", type=int, default=DEFAULT_README_KB)
+    args = parser.parse_args()
+
+    state = MockApiState(
+        repos=args.repos, latency_ms=args.latency_ms, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, readme_kb=args.readme_kb
+    )
+    with MockApiServer(state, port=args.port) as server:
+        for name, value in server.env().items():
+            print(f"export {name}={value}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()
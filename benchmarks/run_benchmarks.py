@@ -0,0 +1,252 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+import subprocess
+from mock_server import MockApiServer, MockApiState
+
+# Offline benchmarks for the fetch strategies and report rendering.
+# Every scenario runs in its own child process against a local mock API, so
+# peak memory is per scenario and no request leaves the machine.
+#
+#   python benchmarks/run_benchmarks.py --repos 100,5000 --latency-ms 20
+
+# Configuration Section
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.abspath(os.path.join(BENCH_DIR, "..", "scripts"))
+BENCH_ORG = "bench-org"
+
+# Scenario name -> what it measures
+FETCH_SCENARIOS = {
+    "rest_listing": "generate_csv2.iter_github_repos (Link fan-out)",
+    "graphql_listing": "generate_csv.iter_github_repos_graphql (cursor, READMEs inline)",
+    "org_properties": "generate_csv2.get_org_custom_properties (org-level, 100 per page)",
+    "repo_properties": "generate_csv2.get_custom_properties (one request per repo)",
+    "readme_check": "generate_csv.check_codacy_badge (streamed raw README per repo)",
+    "codacy_index": "codacy_search.index_codacy_org (v3 search pages into a RepoIndex, as the audit runs it)",
+    "codacy_lookup": "generate_csv2.is_codacy_project (one v3 request per repo, --incremental/webhook path)",
+    "codacy_search": "codacy_csv.iter_codacy_rows (v3 cursor loop + analysis details missing from the search)",
+}
+REPORT_SCENARIOS = {
+    "final_reports": "final_reports.render_reports (charts + Excel)",
+}
+
+# Helper Functions
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def scenario_env(base_env, work_dir):
+    """Environment for a scenario child: mock API URLs, dummy tokens, scratch paths."""
+    return {
+        **os.environ,
+        **base_env,
+        "TOKEN_GITHUB": "bench-token",
+        "ORG_GITHUB": BENCH_ORG,
+        "CODACY_API_TOKEN": "bench-token",
+        "CODACY_ORG_NAME": BENCH_ORG,
+        "HTTP_CACHE_PATH": os.path.join(work_dir, "http_cache.sqlite"),
+        "SNAPSHOT_DB_PATH": os.path.join(work_dir, "snapshots.sqlite"),
+        "RUN_PROFILE_DIR": work_dir,
+        "CHART_WORKERS": os.getenv("CHART_WORKERS", "0"),
+    }
+
+# --------------------- Scenarios (child process) ----------------------------------
+
+async def list_repos(client, generate_csv2):
+    """The audit's REST listing (generate_csv2.iter_github_repos), collected into one list."""
+    repos = []
+    async for batch in generate_csv2.iter_github_repos(client, BENCH_ORG):
+        repos.extend(batch)
+    return repos
+
+async def run_fetch_scenario(name):
+    """Run one fetch scenario; returns (items, requests, retries)."""
+    import generate_csv
+    import generate_csv2
+    import codacy_csv
+    import codacy_search
+    from http_client import HttpClient
+    from repo_index import RepoIndex
+
+    async with HttpClient() as client:
+        if name == "rest_listing":
+            items = len(await list_repos(client, generate_csv2))
+        elif name == "graphql_listing":
+            items = 0
+            async for batch in generate_csv.iter_github_repos_graphql(client, BENCH_ORG):
+                items += len(batch)
+        elif name == "org_properties":
+            items = len(await generate_csv2.get_org_custom_properties(client, BENCH_ORG))
+        elif name == "repo_properties":
+            repos = await list_repos(client, generate_csv2)
+            client.stats.requests = client.stats.retries = 0
+            results = await asyncio.gather(*(
+                generate_csv2.get_custom_properties(client, BENCH_ORG, repo.name) for repo in repos
+            ))
+            items = len(results)
+        elif name == "readme_check":
+            repos = await list_repos(client, generate_csv2)
+            client.stats.requests = client.stats.retries = 0
+            results = await asyncio.gather(*(
+                generate_csv.check_codacy_badge(client, BENCH_ORG, repo.name) for repo in repos
+            ))
+            items = len(results)
+        elif name == "codacy_lookup":
+            repos = await list_repos(client, generate_csv2)
+            client.stats.requests = client.stats.retries = 0
+            results = await asyncio.gather(*(
+                generate_csv2.is_codacy_project(client, BENCH_ORG, repo.name) for repo in repos
+            ))
+            # Items are the integrated repos: the mock also answers 200 for repos Codacy doesn't follow
+            items = sum(results)
+        elif name == "codacy_index":
+            items = await codacy_search.index_codacy_org(
+                client, BENCH_ORG, RepoIndex(), codacy_search.codacy_headers("bench-token")
+            )
+        elif name == "codacy_search":
+            # Every repo counts as SOC here, so the row building is measured too
+            soc_repos = {f"{BENCH_ORG}/repo-{i:05d}".lower() for i in range(int(os.environ["BENCH_REPOS"]))}
+            items = 0
+            async for _ in codacy_csv.iter_codacy_rows(client, soc_repos, orgs=[BENCH_ORG]):
+                items += 1
+        else:
+            raise Exception(f"🚨 Unknown scenario: {name}")
+    return items, client.stats.requests, client.stats.retries
+
+def run_report_scenario(rows, work_dir):
+    """Render every chart and the Excel report for `rows` synthetic repos."""
+    import random
+    import final_reports
+
+    for attr in dir(final_reports):
+        if attr.startswith("PNG_") or attr.endswith("EXCEL_FILE"):
+            setattr(final_reports, attr, os.path.join(work_dir, os.path.basename(getattr(final_reports, attr))))
+
+    rng = random.Random(1)
+    records = [
+        {
+            "S no.": i + 1,
+            "name": f"repo-{i:05d}",
+            "repo link": f"https://github.com/{BENCH_ORG}/repo-{i:05d}",
+            "grade": rng.choice("ABCDF"),
+            "coverage percentage": f"{rng.uniform(0, 100):.2f}",
+            "issue percentage": f"{rng.uniform(0, 100):.2f}",
+        }
+        for i in range(rows)
+    ]
+    frame = final_reports.frame_from_records(records)
+    final_reports.render_reports(frame, 80.0, 90.0)
+    return rows, 0, 0
+
+def child_main(name, work_dir):
+    """Entry point of a scenario child: prints one JSON result line on stdout."""
+    sys.path.insert(0, SCRIPTS_DIR)
+    # Scenario output (progress prints) goes to stderr so stdout stays parseable
+    stdout = sys.stdout
+    sys.stdout = sys.stderr
+
+    start = time.perf_counter()
+    if name in REPORT_SCENARIOS:
+        items, requests, retries = run_report_scenario(int(os.environ["BENCH_REPORT_ROWS"]), work_dir)
+    else:
+        items, requests, retries = asyncio.run(run_fetch_scenario(name))
+    seconds = time.perf_counter() - start
+
+    result = {
+        "scenario": name,
+        "items": items,
+        "requests": requests,
+        "retries": retries,
+        "seconds": round(seconds, 3),
+        "requests_per_second": round(requests / seconds, 1) if seconds and requests else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    stdout.write(json.dumps(result) + "\n")
+
+# --------------------- Harness ----------------------------------
+
+def run_child(name, env, work_dir):
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", name, "--work-dir", work_dir],
+        env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    if proc.returncode != 0:
+        raise Exception(f"🚨 Benchmark scenario {name} failed:\n{proc.stderr[-4000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def print_results(results):
+    header = f"{'scenario':<18}{'repos':>8}{'items':>8}{'requests':>10}{'retries':>9}{'seconds':>10}{'req/s':>10}{'peak MiB':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        rps = r["requests_per_second"] if r["requests_per_second"] is not None else "-"
+        print(
+            f"{r['scenario']:<18}{r['repos']:>8}{r['items']:>8}{r['requests']:>10}{r['retries']:>9}"
+            f"{r['seconds']:>10.2f}{rps:>10}{r['peak_rss_mb']:>10.1f}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fetch strategies and report rendering offline.")
+    parser.add_argument("--repos", default="100,1000", help="comma-separated org sizes (default: 100,1000)")
+    parser.add_argument(
+        "--scenarios", default=",".join([*FETCH_SCENARIOS, *REPORT_SCENARIOS]),
+        help="comma-separated scenarios (default: all)"
+    )
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added latency per mock request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 502")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--readme-kb", type=int, default=4, help="README size in KiB")
+    parser.add_argument("--report-rows", type=int, default=10000, help="rows for the final_reports scenario")
+    parser.add_argument("--output", help="also write the results as JSON to this path")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child_main(args.child, args.work_dir)
+        return
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in FETCH_SCENARIOS and name not in REPORT_SCENARIOS]
+    if unknown:
+        raise Exception(f"🚨 Unknown scenarios: {', '.join(unknown)}")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="audit-bench-") as work_dir:
+        report_scenarios = [name for name in scenarios if name in REPORT_SCENARIOS]
+        for name in report_scenarios:
+            print(f"▶️ {name}: {args.report_rows} rows")
+            env = {**scenario_env({}, work_dir), "BENCH_REPORT_ROWS": str(args.report_rows)}
+            results.append({**run_child(name, env, work_dir), "repos": args.report_rows})
+
+        for repos in (int(size) for size in args.repos.split(",")):
+            state = MockApiState(
+                repos=repos, latency_ms=args.latency_ms, error_rate=args.error_rate,
+                throttle_rate=args.throttle_rate, readme_kb=args.readme_kb
+            )
+            with MockApiServer(state) as server:
+                for name in scenarios:
+                    if name in REPORT_SCENARIOS:
+                        continue
+                    print(f"▶️ {name}: {repos} repos")
+                    env = {**scenario_env(server.env(), work_dir), "BENCH_REPOS": str(repos)}
+                    results.append({**run_child(name, env, work_dir), "repos": repos})
+            print(f"   mock API served {state.requests} requests ({state.injected} injected faults)")
+
+    print()
+    print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results saved: {args.output}")
+
+if __name__ == "__main__":
+    main()
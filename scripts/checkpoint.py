@@ -0,0 +1,80 @@
+import os
+import json
+from datetime import datetime
+
+# Configuration Section
+
+# Checkpoint journals of interrupted runs; kept in .cache/ next to the inventories, never committed
+CHECKPOINT_DIR = os.getenv(
+    "CHECKPOINT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache", "checkpoints")
+)
+
+# --------------------- Journal ----------------------------------
+
+class Journal:
+    """
+    Append-only NDJSON journal of the work a run has finished (listing
+    pages, search pages with their cursors, per-repo results), so a run that
+    dies part way can be resumed without redoing it.
+
+    Every entry is flushed as soon as it is recorded and is not kept in
+    memory, so a run does not hold a second copy of what it fetched. A fresh
+    run truncates the journal; with resume=True the previous one is loaded
+    first and rewritten without the line that was being written when the
+    run died, and only those loaded entries are returned by entries().
+    The journal is deleted once the run completes.
+    """
+
+    def __init__(self, name, resume=False, checkpoint_dir=CHECKPOINT_DIR):
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.path = os.path.join(checkpoint_dir, f"{name}.ndjson")
+        self._entries = []
+        if resume:
+            self._load()
+        self._file = open(self.path, "w", encoding="utf-8")
+        for entry in self._entries:
+            self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        if not self._entries:
+            self.record("run", started_at=datetime.now().isoformat(timespec="seconds"))
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            print(f"⚠️ No checkpoint at {self.path}, starting from scratch.")
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    self._entries.append(json.loads(line))
+                except ValueError:
+                    break  # the line being written when the run died
+        started_at = self._entries[0].get("started_at") if self._entries else None
+        print(f"⏯️ Resuming from {self.path} ({len(self._entries)} entries, run started {started_at})")
+
+    def record(self, kind, **fields):
+        self._file.write(json.dumps({"kind": kind, **fields}) + "\n")
+        self._file.flush()
+
+    def entries(self, kind, **match):
+        """Entries of one kind recorded by the resumed run whose fields equal `match`, in recording order."""
+        return [
+            entry for entry in self._entries
+            if entry["kind"] == kind and all(entry.get(key) == value for key, value in match.items())
+        ]
+
+    def complete(self):
+        """The run finished: drop the journal, so the next --resume starts fresh."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
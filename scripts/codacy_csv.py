@@ -1,141 +1,343 @@
 import os
-import requests
 import csv
 import sys
 import glob
+import asyncio
+import argparse
+from collections import deque
 from datetime import datetime
+from http_client import HttpClient
+from http_cache import HttpCache
+from snapshot_store import SnapshotStore, run_timestamp
+from repo_index import repo_key, codacy_item_key
+from codacy_search import CODACY_API_URL, PROVIDER, LIMIT, codacy_headers, iter_codacy_pages, index_codacy_org
+from checkpoint import Journal
+from report_sinks import CODACY_SCHEMA, write_sinks
+from instrumentation import instrumented, stage
 
 API_TOKEN = os.getenv("CODACY_API_TOKEN", "TdQ0e56GavNJdj0mpwXX")
-PROVIDER = "gh"
 ORG_NAME = os.getenv("CODACY_ORG_NAME", "octanner")
+
+# CODACY_ORG_NAME may list several orgs separated by commas; they are searched concurrently
+ORG_NAMES = [org.strip() for org in ORG_NAME.split(",") if org.strip()]
 REPORTS_DIR = os.path.join(os.path.dirname(__file__), "..", "reports")
-timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-OUTPUT_CSV = os.path.join(REPORTS_DIR, f"codacy_soc_compliant_report_{timestamp}.csv")
-LIMIT = 1000
 
-os.makedirs(REPORTS_DIR, exist_ok=True)
+# Per-repo analysis requests in flight at once while enriching the SOC rows
+DETAIL_CONCURRENCY = int(os.getenv("CODACY_DETAIL_CONCURRENCY", "16"))
+
+# Memo namespace of the per-repo analysis details, keyed by repo and last analysed commit
+DETAIL_MEMO = "codacy_details"
+
+DETAIL_COLUMNS = ["issue percentage", "complexity percentage", "duplication percentage"]
+HEADER = [
+    "S no.", "name", "repo link", "compliance", "codacy integrated", "grade", "coverage percentage", "org"
+] + DETAIL_COLUMNS
+COVERAGE_INDEX = HEADER.index("coverage percentage") - 1  # position in a row without the serial number
+
+headers = codacy_headers(API_TOKEN)
+
+def analysis_url(owner, name):
+    return f"{CODACY_API_URL}/analysis/organizations/{PROVIDER}/{owner}/repositories/{name}"
+
+def percentage(value):
+    return f"{value:.2f}" if isinstance(value, (int, float)) else ""
 
 # --- Find latest SOC-compliant file ---
 def find_latest_soc_file():
     pattern = os.path.join(REPORTS_DIR, "soc_compliant_repos2_*.csv")
     files = glob.glob(pattern)
     if not files:
-        print("\u274c No SOC-compliant report found. Expected format: soc_compliant_repos2_*.csv")
+        print("❌ No SOC-compliant report found. Expected format: soc_compliant_repos2_*.csv")
         sys.exit(1)
     latest_file = max(files, key=os.path.getmtime)
-    print(f"\ud83d\udcc4 Using latest SOC-compliant file: {os.path.basename(latest_file)}")
+    print(f"\U0001f4c4 Using latest SOC-compliant file: {os.path.basename(latest_file)}")
     return latest_file
 
-SOC_CSV = find_latest_soc_file()
-
 # Read SOC-compliant repo names
-soc_repos = set()
-with open(SOC_CSV, newline="", encoding="utf-8") as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        repo_url = row.get("repo url", "")
-        if repo_url:
-            repo_name = repo_url.replace("https://github.com/", "").strip().lower()
-            soc_repos.add(repo_name)
-
-headers = {
-    "Content-Type": "application/json",
-    "Accept": "application/json",
-    "api-token": API_TOKEN
-}
-
-url = f"https://app.codacy.com/api/v3/search/analysis/organizations/{PROVIDER}/{ORG_NAME}/repositories"
-
-all_repos = []
-cursor = None
-iteration = 1
-
-while True:
-    print(f"\n---- API CALL #{iteration} ----")
-    payload = {"limit": LIMIT}
-    if cursor:
-        payload["cursor"] = cursor
-    print(f"Payload being sent: {payload}")
+def load_soc_repos(soc_csv):
+    soc_repos = set()
+    with open(soc_csv, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            repo_url = row.get("repo url", "")
+            if repo_url:
+                soc_repos.add(repo_key(repo_url))
+    return soc_repos
+
+# --- Build one CSV row (without the serial number) from a search result ---
+# soc_repos=None builds the row unconditionally, for results already matched by a RepoIndex
+def build_codacy_row(item, soc_repos=None):
+    repo_info = item.get("repository", {})
+    name = repo_info.get("name", "")
+    owner = repo_info.get("owner", "")
+    if soc_repos is not None and repo_key(f"{owner}/{name}") not in soc_repos:
+        return None  # Skip non-SOC compliant repos
+
+    provider = repo_info.get("provider", "")
+    repo_link = f"https://github.com/{owner}/{name}" if provider == "gh" and owner and name else ""
+    codacy_integrated = "Yes" if repo_info.get("addedState", "") == "Following" else "No"
+    compliance = repo_info.get("codingStandardName", "")
+    grade = item.get("gradeLetter", "") or item.get("grade", "")
+
+    coverage = ""
+    cov = item.get("coverage", {})
+    if cov:
+        if cov.get("coveragePercentage") is not None:
+            coverage = f"{cov['coveragePercentage']:.2f}"
+        elif cov.get("numberTotalFiles"):
+            total_files = cov["numberTotalFiles"]
+            files_uncovered = cov.get("filesUncovered", 0)
+            coverage = f"{(1 - files_uncovered / total_files) * 100:.2f}" if total_files else ""
+
+    return [name, repo_link, compliance, codacy_integrated, grade, coverage, owner]
+
+# --- Per-repo analysis details (issues, complexity, duplication, coverage) ---
+def analysis_details(data):
+    """Pull the detail metrics out of a repository analysis, formatted like the CSV columns."""
+    return {
+        "issue percentage": percentage(data.get("issuesPercentage")),
+        "complexity percentage": percentage(data.get("complexFilesPercentage")),
+        "duplication percentage": percentage(data.get("duplicationPercentage")),
+        "coverage percentage": percentage((data.get("coverage") or {}).get("coveragePercentage")),
+    }
+
+async def fetch_analysis_details(client, owner, name, commit, semaphore):
+    """
+    Fetch one repository's analysis details, at most `semaphore` at a time.
+    Details are memoized in the client's HTTP cache together with the last
+    analysed commit, so a repo is only refetched once Codacy analysed a new
+    commit. Returns None when the details are unavailable.
+    """
+    cache = client.cache
+    memo_key = f"{owner}/{name}".lower()
+    if cache is not None and commit:
+        memo = cache.memo_get(DETAIL_MEMO, memo_key)
+        if memo and memo["commit"] == commit:
+            return memo["details"]
+
+    async with semaphore:
+        response = await client.get(analysis_url(owner, name), headers=headers)
+    if response.status_code != 200:
+        print(f"⚠️ {owner}/{name}: Codacy analysis details unavailable (status {response.status_code})")
+        return None
+
+    data = response.json().get("data") or {}
+    details = analysis_details(data)
+    commit = (data.get("lastAnalysedCommit") or {}).get("sha") or commit
+    if cache is not None and commit:
+        cache.memo_set(DETAIL_MEMO, memo_key, {"commit": commit, "details": details})
+    return details
+
+async def enrich_codacy_row(client, row, item, semaphore):
+    """
+    Append the detail columns to a row built by build_codacy_row.
+    The search result already carries the detail metrics; the repository
+    analysis is only fetched for the ones it is missing.
+    """
+    details = analysis_details(item)
+    if not all(details[column] for column in DETAIL_COLUMNS):
+        repo_info = item.get("repository", {})
+        commit = (item.get("lastAnalysedCommit") or {}).get("sha")
+        with stage("codacy_details"):
+            fetched = await fetch_analysis_details(
+                client, repo_info.get("owner", ""), repo_info.get("name", ""), commit, semaphore
+            ) or {}
+        details = {column: value or fetched.get(column, "") for column, value in details.items()}
+    if not row[COVERAGE_INDEX]:
+        row[COVERAGE_INDEX] = details["coverage percentage"]
+    return row + [details[column] for column in DETAIL_COLUMNS]
+
+async def iter_orgs_pages(client, orgs, limit=LIMIT, failed_orgs=None, journal=None):
+    """
+    Yield (org, page) for every org's search, all orgs paging concurrently
+    over the shared client; pages are yielded in arrival order.
+    An org whose search fails is reported, appended to failed_orgs and skipped.
+    """
+    queue = asyncio.Queue()
+    finished = object()
+
+    async def pump(org):
+        try:
+            with stage("codacy_pagination"):
+                async for repos in iter_codacy_pages(client, org, headers, limit, journal):
+                    queue.put_nowait((org, repos))
+        except Exception as e:
+            print(f"❌ {org}: Codacy search failed: {e}")
+            if failed_orgs is not None:
+                failed_orgs.append(org)
+        finally:
+            queue.put_nowait(finished)
 
+    tasks = [asyncio.ensure_future(pump(org)) for org in orgs]
     try:
-        response = requests.post(url, headers=headers, json=payload)
-    except Exception as e:
-        print(f"Network/request error: {e}")
-        sys.exit(1)
+        running = len(tasks)
+        while running:
+            item = await queue.get()
+            if item is finished:
+                running -= 1
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
 
-    print(f"Status code: {response.status_code}")
-    if response.status_code in [401, 403]:
-        print("AUTHENTICATION ERROR: Please check your API token. Exiting.")
-        print("Response:", response.text)
-        sys.exit(1)
+async def iter_codacy_rows(client, soc_repos, limit=LIMIT, orgs=None, failed_orgs=None, journal=None):
+    """
+    Stream Codacy search results of every org (default: ORG_NAMES) through
+    the SOC repo set, yielding each matching row (with its serial number).
+    Matching rows whose search result lacks some detail metrics get them from
+    the per-repo analysis, fetched while the search keeps paging,
+    DETAIL_CONCURRENCY at a time; rows are yielded in search order.
+    With a journal, search pages and finished rows are recorded, and rows
+    recorded by an interrupted run are reused without fetching their details.
+    Orgs whose search failed are appended to failed_orgs.
+    """
+    written = 0
+    fetched = {}
+    semaphore = asyncio.Semaphore(DETAIL_CONCURRENCY)
+    pending = deque()
+    recorded = {entry["key"]: entry["row"] for entry in journal.entries("codacy_row")} if journal is not None else {}
+
+    async def finished_row(row, item):
+        key = codacy_item_key(item)
+        if key in recorded:
+            return recorded[key]
+        row = await enrich_codacy_row(client, row, item, semaphore)
+        if journal is not None:
+            journal.record("codacy_row", key=key, row=row)
+        return row
 
     try:
-        data = response.json()
-    except Exception as e:
-        print(f"JSON decoding error: {e}")
-        print("Raw response:", response.text)
-        sys.exit(1)
+        async for org, repos in iter_orgs_pages(client, orgs or ORG_NAMES, limit, failed_orgs, journal):
+            fetched[org] = fetched.get(org, 0) + len(repos)
+            for item in repos:
+                row = build_codacy_row(item, soc_repos)
+                if row:
+                    pending.append(asyncio.ensure_future(finished_row(row, item)))
+            print(f"{org}: fetched {len(repos)} repos, total so far: {fetched[org]}")
 
-    print("Top-level keys in response:", list(data.keys()))
-    if "data" not in data:
-        print("ERROR: 'data' field missing from response. Response was:")
-        print(data)
-        sys.exit(1)
+            while pending and pending[0].done():
+                written += 1
+                yield [written] + pending.popleft().result()
 
-    repos = data.get("data", [])
-    all_repos.extend(repos)
-    print(f"Fetched {len(repos)} repos, total so far: {len(all_repos)}")
-
-    pagination = data.get("pagination")
-    if not pagination:
-        print("INFO: No pagination block, ending.")
-        break
-
-    cursor = pagination.get("cursor")
-    if not cursor:
-        print("INFO: No further cursor found, ending pagination.")
-        break
-
-    print(f"Next cursor: {cursor}")
-    iteration += 1
-
-# Save to CSV
-if all_repos:
-    header = ["S no.", "name", "repo link", "compliance", "codacy integrated", "grade", "coverage percentage"]
-    csv_rows = []
-    idx = 1
-    for item in all_repos:
-        repo_info = item.get("repository", {})
-        name = repo_info.get("name", "")
-        owner = repo_info.get("owner", "")
-        full_name = f"{owner}/{name}".lower()
-        if full_name not in soc_repos:
-            continue  # Skip non-SOC compliant repos
-
-        provider = repo_info.get("provider", "")
-        repo_link = f"https://github.com/{owner}/{name}" if provider == "gh" and owner and name else ""
-        codacy_integrated = "Yes" if repo_info.get("addedState", "") == "Following" else "No"
-        compliance = repo_info.get("codingStandardName", "")
-        grade = item.get("gradeLetter", "") or item.get("grade", "")
-
-        coverage = ""
-        cov = item.get("coverage", {})
-        if cov:
-            if cov.get("coveragePercentage") is not None:
-                coverage = f"{cov['coveragePercentage']:.2f}"
-            elif cov.get("numberTotalFiles"):
-                total_files = cov["numberTotalFiles"]
-                files_uncovered = cov.get("filesUncovered", 0)
-                coverage = f"{(1 - files_uncovered / total_files) * 100:.2f}" if total_files else ""
-
-        csv_rows.append([idx, name, repo_link, compliance, codacy_integrated, grade, coverage])
-        idx += 1
-
-    with open(OUTPUT_CSV, "w", newline="", encoding="utf-8") as f:
+        while pending:
+            written += 1
+            yield [written] + await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+
+# --- Feed and read the repo identity index ---
+async def index_codacy_orgs(client, index, orgs=None, limit=LIMIT, failed_orgs=None, journal=None):
+    """
+    Page the Codacy search of every org (default: ORG_NAMES) that is not in
+    the index yet, concurrently, so no org is scanned twice in one run.
+    Orgs whose search failed are reported and appended to failed_orgs.
+    """
+    async def index_org(org):
+        try:
+            with stage("codacy_pagination"):
+                count = await index_codacy_org(client, org, index, headers, limit, journal)
+        except Exception as e:
+            print(f"❌ {org}: Codacy search failed: {e}")
+            if failed_orgs is not None:
+                failed_orgs.append(org)
+            return
+        print(f"{org}: fetched {count} repos")
+
+    await asyncio.gather(*(
+        index_org(org) for org in orgs or ORG_NAMES if org.lower() not in index.codacy_orgs
+    ))
+
+async def iter_indexed_rows(client, index, soc_keys):
+    """
+    Yield the Codacy row (with its serial number) of every SOC repo key that
+    the index matched to a Codacy search result, in soc_keys order; missing
+    detail metrics are fetched DETAIL_CONCURRENCY at a time.
+    """
+    semaphore = asyncio.Semaphore(DETAIL_CONCURRENCY)
+    tasks = [
+        asyncio.ensure_future(enrich_codacy_row(client, build_codacy_row(item), item, semaphore))
+        for item in index.codacy_items(soc_keys)
+    ]
+    try:
+        for written, task in enumerate(tasks, 1):
+            yield [written] + await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def report_path():
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    return os.path.join(REPORTS_DIR, f"codacy_soc_compliant_report_{timestamp}.csv")
+
+async def write_codacy_report(client, soc_repos, output_csv, limit=LIMIT, failed_orgs=None, journal=None):
+    """
+    Write each matching row to the CSV as its page arrives, so the full
+    search results are never held in memory; the typed sinks follow once
+    all rows are in.
+    Returns the rows written, as records keyed by column name.
+    """
+    records = []
+    with open(output_csv, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow(header)
-        writer.writerows(csv_rows)
+        writer.writerow(HEADER)
+        async for row in iter_codacy_rows(client, soc_repos, limit, failed_orgs=failed_orgs, journal=journal):
+            writer.writerow(row)
+            records.append(dict(zip(HEADER, row)))
+    if records:
+        write_sinks(output_csv, HEADER, [list(record.values()) for record in records], CODACY_SCHEMA)
+    return records
+
+def export_to_csv(rows, output_csv):
+    """Write rows already collected in memory, for callers using the CSV as a sink."""
+    with open(output_csv, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    print(f"✅ Saved {len(rows)} SOC-compliant Codacy repositories to {output_csv}")
+    write_sinks(output_csv, HEADER, rows, CODACY_SCHEMA)
+
+async def run(resume=False):
+    soc_repos = load_soc_repos(find_latest_soc_file())
+    output_csv = report_path()
+
+    failed_orgs = []
+    with Journal("codacy_csv", resume=resume) as journal:
+        async with HttpClient(cache=HttpCache()) as client:
+            records = await write_codacy_report(
+                client, soc_repos, output_csv, failed_orgs=failed_orgs, journal=journal
+            )
+        if not failed_orgs:
+            journal.complete()
+    print(client.stats.summary())
+    print(client.cache.summary())
+    # A run missing an org would become the next diff's baseline, so only complete runs are recorded
+    if failed_orgs:
+        print("⚠️ Snapshot not recorded: the Codacy search is missing some orgs.")
+    else:
+        with SnapshotStore() as store:
+            store.append_records(run_timestamp(), "codacy", records, org=",".join(ORG_NAMES))
+
+    if records:
+        print(f"✅ Saved {len(records)} SOC-compliant Codacy repositories to {output_csv}")
+    else:
+        os.remove(output_csv)
+        print("⚠️ No repositories found or saved. Please check the output above.")
+
+    if failed_orgs:
+        raise Exception(f"🚨 Codacy search failed for: {', '.join(failed_orgs)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the Codacy analysis of SOC-compliant repositories to CSV.")
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="continue an interrupted run from its checkpoint journal, skipping finished pages and repos"
+    )
+    args = parser.parse_args()
+    with instrumented("codacy_csv"):
+        asyncio.run(run(resume=args.resume))
 
-    print(f"\u2705 Saved {len(csv_rows)} SOC-compliant Codacy repositories to {OUTPUT_CSV}")
-else:
-    print("\u26a0\ufe0f No repositories found or saved. Please check the debug output above.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+import asyncio
+
+# Codacy v3 repository search, shared by the scripts that need to know which
+# repos Codacy analyses: cursor pagination with the next page requested
+# ahead, optional checkpointing, and feeding the results into a RepoIndex.
+# Callers pass their own Codacy headers, since each script reads its token.
+
+# Configuration Section
+
+# API root, overridable to point at a local mock server
+CODACY_API_URL = os.getenv("CODACY_API_URL", "https://app.codacy.com/api/v3").rstrip("/")
+PROVIDER = "gh"
+
+# Repositories requested per search page
+LIMIT = int(os.getenv("CODACY_PAGE_LIMIT", "1000"))
+
+# Helper Functions
+
+def search_url(org):
+    return f"{CODACY_API_URL}/search/analysis/organizations/{PROVIDER}/{org}/repositories"
+
+def codacy_headers(token):
+    return {
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+        "api-token": token
+    }
+
+# --------------------- Search ----------------------------------
+
+# Errors are raised rather than exiting, so one failing org does not stop the others
+async def fetch_page(client, org, cursor, limit, iteration, headers):
+    payload = {"limit": limit}
+    if cursor:
+        payload["cursor"] = cursor
+
+    try:
+        response = await client.post(search_url(org), headers=headers, json=payload)
+    except Exception as e:
+        raise Exception(f"🚨 Network/request error for {org} (page {iteration}): {e}")
+
+    if response.status_code in [401, 403]:
+        raise Exception(
+            f"🚨 AUTHENTICATION ERROR for {org}: Please check your API token. Response: {response.text}"
+        )
+
+    try:
+        data = response.json()
+    except Exception as e:
+        raise Exception(f"🚨 JSON decoding error for {org} (page {iteration}): {e}. Raw response: {response.text}")
+
+    if "data" not in data:
+        raise Exception(f"🚨 'data' field missing from {org} response. Response was: {data}")
+    return data
+
+async def iter_codacy_pages(client, org, headers, limit=LIMIT, journal=None):
+    """
+    Yield each page of Codacy search results using cursor pagination.
+    The request for the next page is sent as soon as its cursor is known,
+    before the current page is handed to the caller.
+    With a journal, each page is recorded with the cursor of the page after
+    it; on resume the recorded pages are replayed and the search continues
+    from the last recorded cursor.
+    """
+    recorded = journal.entries("codacy_page", org=org) if journal is not None else []
+    for entry in recorded:
+        yield entry["items"]
+    if recorded and not recorded[-1]["cursor"]:
+        return  # the search had finished
+
+    iteration = len(recorded) + 1
+    cursor = recorded[-1]["cursor"] if recorded else None
+    next_page = asyncio.ensure_future(fetch_page(client, org, cursor, limit, iteration, headers))
+    try:
+        while next_page is not None:
+            data = await next_page
+            next_page = None
+
+            pagination = data.get("pagination")
+            cursor = pagination.get("cursor") if pagination else None
+            if cursor:
+                iteration += 1
+                next_page = asyncio.ensure_future(fetch_page(client, org, cursor, limit, iteration, headers))
+
+            if journal is not None:
+                journal.record("codacy_page", org=org, cursor=cursor, items=data.get("data", []))
+            yield data.get("data", [])
+    finally:
+        if next_page is not None:
+            next_page.cancel()
+
+async def index_codacy_org(client, org, index, headers, limit=LIMIT, journal=None):
+    """Page one org's Codacy search into a RepoIndex; returns the number of repositories seen."""
+    count = 0
+    async for items in iter_codacy_pages(client, org, headers, limit, journal):
+        index.add_codacy_items(items)
+        count += len(items)
+    index.codacy_orgs.add(org.lower())
+    return count
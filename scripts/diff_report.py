@@ -0,0 +1,174 @@
+import os
+import csv
+import json
+import argparse
+from collections import Counter
+from snapshot_store import SnapshotStore, SNAPSHOT_FIELDS, REPORTS_DIR
+
+# Configuration Section
+
+# Best grade first; a move to a later letter is a drop
+GRADE_ORDER = ["A", "B", "C", "D", "E", "F"]
+
+CHANGE_HEADER = ["repo", "change", "before", "after"]
+
+# Helper Functions
+
+def grade_rank(grade):
+    grade = (grade or "").strip().upper()
+    return GRADE_ORDER.index(grade) if grade in GRADE_ORDER else None
+
+def fields_differ(before, after):
+    """True when a field known to both snapshots has a different value."""
+    return any(
+        before[field] != after[field]
+        for field in SNAPSHOT_FIELDS
+        if before[field] is not None and after[field] is not None
+    )
+
+def metric_changes(repo, label, before, after, benchmark):
+    """Report a metric crossing its benchmark in either direction."""
+    if before is None or after is None:
+        return []
+    if before >= benchmark > after:
+        return [(repo, f"{label}_below_benchmark", before, after)]
+    if before < benchmark <= after:
+        return [(repo, f"{label}_recovered", before, after)]
+    return []
+
+def diff_snapshots(previous, current, coverage_benchmark, issue_benchmark, stage="soc"):
+    """
+    Compare two runs given as {repo: fields} (SnapshotStore.run_rows) in one
+    pass over the union of their keys. Fields missing from either run are
+    not compared, so partial runs of different stages don't report noise.
+    Returns (changes, changed_repos): (repo, change, before, after) tuples
+    sorted by repo, and how many repos were added, removed or differ in a
+    field both runs know, including moves that are not reported as a
+    change (e.g. coverage 40% -> 50% under an 80% benchmark).
+    """
+    added, removed = ("became_soc", "left_soc") if stage == "soc" else ("added", "removed")
+    changes = []
+    changed_repos = 0
+    for repo in current.keys() | previous.keys():
+        before = previous.get(repo)
+        after = current.get(repo)
+        if before is None:
+            changed_repos += 1
+            changes.append((repo, added, None, after["name"]))
+            continue
+        if after is None:
+            changed_repos += 1
+            changes.append((repo, removed, before["name"], None))
+            continue
+        if not fields_differ(before, after):
+            continue
+        changed_repos += 1
+
+        if before["codacy_integrated"] is not None and after["codacy_integrated"] is not None:
+            if before["codacy_integrated"] and not after["codacy_integrated"]:
+                changes.append((repo, "codacy_lost", "yes", "no"))
+            elif after["codacy_integrated"] and not before["codacy_integrated"]:
+                changes.append((repo, "codacy_gained", "no", "yes"))
+
+        old_rank, new_rank = grade_rank(before["grade"]), grade_rank(after["grade"])
+        if old_rank is not None and new_rank is not None and old_rank != new_rank:
+            change = "grade_dropped" if new_rank > old_rank else "grade_raised"
+            changes.append((repo, change, before["grade"], after["grade"]))
+
+        changes += metric_changes(repo, "coverage", before["coverage"], after["coverage"], coverage_benchmark)
+        changes += metric_changes(repo, "issue", before["issue"], after["issue"], issue_benchmark)
+    changes.sort()
+    return changes, changed_repos
+
+def diff_runs(store, stage, coverage_benchmark, issue_benchmark, run_ts=None):
+    """
+    Diff a run of `stage` (default: the latest) against the run of the same
+    stage just before it that audited the same orgs, so a run over other
+    orgs is never taken as the baseline. Only those two runs are read from
+    the store.
+    Returns (previous_run_ts, current_run_ts, changes, changed_repos);
+    previous_run_ts is None when no earlier run covers the same orgs, and
+    there is nothing to compare against.
+    """
+    if run_ts is None:
+        latest = store.latest_runs(stage, count=1)
+        if not latest:
+            raise Exception(f"🚨 No '{stage}' runs recorded in {store.path}")
+        run_ts = latest[0]
+    orgs = store.run_orgs(stage, run_ts)
+    if orgs is None:
+        raise Exception(f"🚨 No '{stage}' run {run_ts} recorded in {store.path}")
+    previous = store.latest_runs(stage, before=run_ts, count=1, orgs=orgs)
+    if not previous:
+        return None, run_ts, [], 0
+    changes, changed_repos = diff_snapshots(
+        store.run_rows(previous[0]), store.run_rows(run_ts),
+        coverage_benchmark, issue_benchmark, stage=stage
+    )
+    return previous[0], run_ts, changes, changed_repos
+
+def write_change_report(stage, previous_run, current_run, changes, changed_repos, reports_dir=REPORTS_DIR):
+    """
+    Write the changes as CSV and JSON next to the other reports.
+    Returns the (csv_path, json_path) written.
+    """
+    os.makedirs(reports_dir, exist_ok=True)
+    stem = f"{stage}_changes_{current_run.replace(':', '-')}"
+    csv_path = os.path.join(reports_dir, f"{stem}.csv")
+    json_path = os.path.join(reports_dir, f"{stem}.json")
+
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(CHANGE_HEADER)
+        writer.writerows(changes)
+
+    report = {
+        "stage": stage,
+        "previous_run": previous_run,
+        "current_run": current_run,
+        "changed_repos": changed_repos,
+        "summary": dict(Counter(change for _, change, _, _ in changes)),
+        "changes": [dict(zip(CHANGE_HEADER, change)) for change in changes],
+    }
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return csv_path, json_path
+
+def print_change_summary(previous_run, current_run, changes, changed_repos):
+    if previous_run is None:
+        print(f"ℹ️ No earlier run of the same orgs before {current_run}, nothing to compare against.")
+        return
+    print(f"🔀 {len(changes)} changes across {changed_repos} updated repos since {previous_run}")
+    for change, count in sorted(Counter(change for _, change, _, _ in changes).items()):
+        print(f"   {change}: {count}")
+
+# --------------------- Main Logic ----------------------------------
+
+def report_changes(store, stage, coverage_benchmark, issue_benchmark, run_ts=None):
+    """Diff a run against the previous one, print a summary and write the change report."""
+    previous_run, current_run, changes, changed_repos = diff_runs(
+        store, stage, coverage_benchmark, issue_benchmark, run_ts
+    )
+    print_change_summary(previous_run, current_run, changes, changed_repos)
+    if previous_run is not None:
+        csv_path, json_path = write_change_report(stage, previous_run, current_run, changes, changed_repos)
+        print(f"✅ Change report saved: {csv_path}, {json_path}")
+    return previous_run, current_run, changes, changed_repos
+
+def main():
+    from final_reports import CONFIG_FILE, load_config
+
+    parser = argparse.ArgumentParser(description="Report what changed since the previous audit run.")
+    parser.add_argument(
+        "--stage", default="soc", choices=["soc", "codacy", "report"],
+        help="which stage's runs to compare (default: soc)"
+    )
+    parser.add_argument("--run", help="run timestamp to diff (default: the latest run of the stage)")
+    args = parser.parse_args()
+
+    coverage_benchmark, issue_benchmark = load_config(CONFIG_FILE)
+    with SnapshotStore() as store:
+        report_changes(store, args.stage, coverage_benchmark, issue_benchmark, args.run)
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,15 @@
 import os
-import csv
+import glob
 import json
-import matplotlib.pyplot as plt
+import argparse
 from collections import Counter
-import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.drawing.image import Image as XLImage
+from datetime import datetime
+from snapshot_store import SnapshotStore, RUN_TS_FORMAT, run_timestamp, since_timestamp
+from diff_report import CHANGE_HEADER, report_changes
+from instrumentation import instrumented, stage
+
+# matplotlib, numpy, pandas and openpyxl are imported inside the functions that use
+# them, so loading this module (e.g. from pipeline.py) stays cheap
 
 # ------------------------ CONFIGURATION ------------------------
 
@@ -27,6 +31,34 @@ PNG_COVERAGE_BAR = os.path.join(REPORT_DIR, "codacy_coverage_barchart.png")
 PNG_BENCHMARK_PIE = os.path.join(REPORT_DIR, "codacy_coverage_benchmark_piechart.png")
 PNG_ISSUE_BAR = os.path.join(REPORT_DIR, "codacy_issue_barchart.png")
 PNG_ISSUE_PIE = os.path.join(REPORT_DIR, "codacy_issue_benchmark_piechart.png")
+PNG_COVERAGE_TREND = os.path.join(REPORT_DIR, "codacy_coverage_trend.png")
+PNG_ISSUE_TREND = os.path.join(REPORT_DIR, "codacy_issue_trend.png")
+CHANGES_EXCEL_FILE = os.path.join(REPORT_DIR, "codacy_changes.xlsx")
+PNG_CHANGES = os.path.join(REPORT_DIR, "codacy_changes_barchart.png")
+
+# Processes used to render charts: 0 = one per CPU, 1 = render serially in-process
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", "0"))
+
+# Defaults for config.json keys controlling the per-repository bar charts:
+# above bar_chart_max_repos repos, one bar per repo is replaced by a histogram
+# and a "worst N below benchmark" chart, plus pages of bar_chart_page_size bars
+# when that is set above 0. Trend charts and the History sheet cover the
+# last trend_days days of the snapshot store
+DEFAULT_CHART_CONFIG = {
+    "bar_chart_max_repos": 60,
+    "bar_chart_page_size": 0,
+    "worst_n": 25,
+    "histogram_bins": 20,
+    "trend_days": 90,
+}
+
+# Columns parsed as numbers (NaN when blank) and written to Excel as numbers
+NUMERIC_COLUMNS = [
+    "S no.", "coverage percentage", "issue percentage", "complexity percentage", "duplication percentage"
+]
+
+# Yes/No column of the CSV that the typed sinks store as a boolean
+CODACY_FLAG_COLUMN = "codacy integrated"
 
 # ------------------------ DATA LOADING FUNCTIONS ------------------------
 
@@ -38,158 +70,562 @@ def load_config(config_path):
     issue_benchmark = config.get("issue_benchmark", 90.0)
     return coverage_benchmark, issue_benchmark
 
+def load_chart_config(config_path):
+    """Load bar chart scaling options from config file, falling back to defaults."""
+    with open(config_path) as f:
+        config = json.load(f)
+    return {key: config.get(key, default) for key, default in DEFAULT_CHART_CONFIG.items()}
+
+def load_csv_frame(csv_path):
+    """
+    Load the report CSV into a pandas DataFrame in one columnar parse.
+    Every column is read as text, then numeric columns are coerced.
+    """
+    import pandas as pd
+
+    frame = pd.read_csv(csv_path, dtype=str, keep_default_na=False, encoding="utf-8")
+    return coerce_report_frame(frame)
+
+def load_report_frame(path):
+    """
+    Load the report from a CSV or from one of the typed sinks written by
+    report_sinks (.parquet, .arrow, .ndjson). Parquet and Arrow files are
+    memory-mapped and converted without a text parse; their float metrics
+    and categorical grade are kept. The boolean Codacy flag is written back
+    as "Yes"/"No" and the run timestamp column is dropped, so the table has
+    the same columns and Codacy values as the CSV.
+    """
+    import pandas as pd
+    from report_sinks import RUN_TS_COLUMN, SINK_EXTENSIONS, read_arrow_table
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (SINK_EXTENSIONS["parquet"], SINK_EXTENSIONS["arrow"]):
+        frame = read_arrow_table(path).to_pandas(split_blocks=True, self_destruct=True)
+    elif extension == SINK_EXTENSIONS["ndjson"]:
+        frame = pd.read_json(path, lines=True, dtype=False, convert_dates=False)
+    else:
+        return load_csv_frame(path)
+
+    if RUN_TS_COLUMN in frame.columns:
+        frame = frame.drop(columns=[RUN_TS_COLUMN])
+    if CODACY_FLAG_COLUMN in frame.columns:
+        frame[CODACY_FLAG_COLUMN] = frame[CODACY_FLAG_COLUMN].map({True: "Yes", False: "No"}).fillna("")
+    return coerce_report_frame(frame)
+
 def load_csv_data(csv_path):
     """
     Load repository names, grades, coverage %, and issue % from CSV.
+    Returns: (repo_names, grades, coverages, issue_percentages) as NumPy arrays
+    """
+    return chart_columns(load_csv_frame(csv_path))
+
+def frame_from_records(records):
+    """Build the same DataFrame as load_csv_frame from in-memory records (dicts keyed by column name)."""
+    import pandas as pd
+
+    return coerce_report_frame(pd.DataFrame.from_records(list(records)))
+
+def coerce_report_frame(frame):
+    """
+    Convert the numeric report columns to float64 in place, with NaN for
+    blank or unparsable cells, so chart statistics run on typed arrays.
+    """
+    import pandas as pd
+
+    for column in NUMERIC_COLUMNS:
+        if column in frame.columns:
+            frame[column] = pd.to_numeric(frame[column], errors="coerce")
+    return frame
+
+def chart_columns(frame):
+    """
+    Pull the columns the charts need out of a report frame.
+    Missing metrics count as 0.0 and missing grades as "Unknown".
     Returns: (repo_names, grades, coverages, issue_percentages)
     """
-    repo_names = []
-    grades = []
-    coverages = []
-    issue_percentages = []
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            repo_names.append(row.get("name", ""))
-            grades.append(row.get("grade") or "Unknown")
-            try:
-                coverage = float(row.get("coverage percentage", 0.0))
-            except (ValueError, KeyError):
-                coverage = 0.0
-            coverages.append(coverage)
-            try:
-                issue_pct = float(row.get("issue percentage", 0.0))
-            except (ValueError, KeyError):
-                issue_pct = 0.0
-            issue_percentages.append(issue_pct)
-    return repo_names, grades, coverages, issue_percentages
+    import numpy as np
+
+    def metric(column):
+        if column not in frame.columns:
+            return np.zeros(len(frame))
+        return frame[column].fillna(0.0).to_numpy(dtype=float)
+
+    if "grade" in frame.columns:
+        # astype(object) first: a categorical grade (typed sinks) cannot take a new "" value
+        grades = frame["grade"].astype(object).fillna("").replace("", "Unknown").to_numpy(dtype=object)
+    else:
+        grades = np.full(len(frame), "Unknown", dtype=object)
+    repo_names = frame["name"].fillna("").to_numpy(dtype=object) if "name" in frame.columns \
+        else np.full(len(frame), "", dtype=object)
+    return repo_names, grades, metric("coverage percentage"), metric("issue percentage")
 
 # ------------------------ CHART GENERATION FUNCTIONS ------------------------
 
+def new_figure(figsize):
+    """
+    Create a figure drawn by the Agg backend without going through pyplot,
+    so charts render headless and can be drawn in parallel processes.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+def benchmark_split(metric_values, benchmark):
+    """Count values above/equal to and below a benchmark."""
+    import numpy as np
+
+    values = np.asarray(metric_values, dtype=float)
+    above = int(np.count_nonzero(values >= benchmark))
+    return above, values.size - above
+
+def print_benchmark_summary(metric_values, benchmark, title):
+    """Print the above/below benchmark analytics shown in the benchmark pie chart."""
+    above, below = benchmark_split(metric_values, benchmark)
+    total = len(metric_values)
+    percent_above = (above / total) * 100 if total else 0
+    percent_below = (below / total) * 100 if total else 0
+
+    print(f"{title} Benchmark: {benchmark}%")
+    print(f"Repositories above or equal to benchmark: {above} ({percent_above:.1f}%)")
+    print(f"Repositories below benchmark: {below} ({percent_below:.1f}%)\n")
+
 def plot_grade_pie_chart(grades, save_path):
     """Plot and save a pie chart of grade distribution."""
-    grade_counts = Counter(grades)
-    plt.figure(figsize=(6,6))
-    plt.pie(grade_counts.values(), labels=grade_counts.keys(), autopct='%1.1f%%', startangle=140)
-    plt.title('Repository Grade Distribution')
-    plt.axis('equal')
-    plt.tight_layout()
-    plt.savefig(save_path)
-    plt.close()
+    import numpy as np
+
+    labels, counts = np.unique(np.asarray(grades, dtype=str), return_counts=True)
+    fig = new_figure((6, 6))
+    ax = fig.add_subplot()
+    ax.pie(counts, labels=labels, autopct='%1.1f%%', startangle=140)
+    ax.set_title('Repository Grade Distribution')
+    ax.axis('equal')
+    fig.tight_layout()
+    fig.savefig(save_path)
 
 def plot_metric_bar_chart(repo_names, metric_values, benchmark, ylabel, title, save_path):
     """
     Plot and save a bar chart for a given metric.
     Green bars: >= benchmark, Red bars: < benchmark.
     """
-    plt.figure(figsize=(max(10, len(repo_names)*0.5), 6))
-    colors = ['green' if v >= benchmark else 'red' for v in metric_values]
-    plt.bar(repo_names, metric_values, color=colors)
-    plt.axhline(benchmark, color='orange', linestyle='dashed', linewidth=2, label=f'Benchmark: {benchmark}%')
-    plt.xlabel('Repository')
-    plt.ylabel(ylabel)
-    plt.title(title)
-    plt.xticks(rotation=45, ha='right')
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(save_path)
-    plt.close()
+    import numpy as np
+
+    fig = new_figure((max(10, len(repo_names)*0.5), 6))
+    ax = fig.add_subplot()
+    colors = np.where(np.asarray(metric_values, dtype=float) >= benchmark, 'green', 'red')
+    ax.bar(list(repo_names), metric_values, color=colors)
+    ax.axhline(benchmark, color='orange', linestyle='dashed', linewidth=2, label=f'Benchmark: {benchmark}%')
+    ax.set_xlabel('Repository')
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(save_path)
+
+def plot_metric_histogram(metric_values, benchmark, xlabel, title, save_path, bins=20):
+    """
+    Plot and save the distribution of a metric over 0-100% in fixed-width bins.
+    Bins starting at or above the benchmark are green, the rest red.
+    Used in place of the per-repository bar chart for large organizations.
+    """
+    import numpy as np
+
+    values = np.asarray(metric_values, dtype=float)
+    counts, edges = np.histogram(np.clip(values, 0, 100), bins=bins, range=(0, 100))
+    colors = np.where(edges[:-1] >= benchmark, 'green', 'red')
+
+    fig = new_figure((10, 6))
+    ax = fig.add_subplot()
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', color=colors, edgecolor='white')
+    ax.axvline(benchmark, color='orange', linestyle='dashed', linewidth=2, label=f'Benchmark: {benchmark}%')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel('Repositories')
+    ax.set_title(f"{title} ({len(values)} repositories)")
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(save_path)
+
+def plot_worst_below_benchmark(repo_names, metric_values, benchmark, ylabel, title, save_path, worst_n=25):
+    """Plot and save a fixed-size bar chart of the worst_n repositories below the benchmark."""
+    import numpy as np
+
+    names = np.asarray(repo_names, dtype=object)
+    values = np.asarray(metric_values, dtype=float)
+    below = np.flatnonzero(values < benchmark)
+    worst = below[np.argsort(values[below], kind='stable')][:worst_n]
+    plot_metric_bar_chart(
+        names[worst], values[worst], benchmark,
+        ylabel=ylabel,
+        title=f"{title}: worst {len(worst)} of {len(below)} below benchmark",
+        save_path=save_path
+    )
+
+def paged_chart_path(save_path, page):
+    root, ext = os.path.splitext(save_path)
+    return f"{root}_page_{page}{ext}"
 
 def plot_benchmark_pie_chart(metric_values, benchmark, above_label, below_label, title, save_path):
     """
     Plot and save a pie chart for above/equal vs. below benchmark.
-    Also prints analytics summary to console.
+    The matching console summary comes from print_benchmark_summary.
     """
-    above = sum(1 for v in metric_values if v >= benchmark)
-    below = sum(1 for v in metric_values if v < benchmark)
-    total = len(metric_values)
-    percent_above = (above / total) * 100 if total else 0
-    percent_below = (below / total) * 100 if total else 0
+    above, below = benchmark_split(metric_values, benchmark)
 
-    print(f"{title} Benchmark: {benchmark}%")
-    print(f"Repositories above or equal to benchmark: {above} ({percent_above:.1f}%)")
-    print(f"Repositories below benchmark: {below} ({percent_below:.1f}%)\n")
+    fig = new_figure((5, 5))
+    ax = fig.add_subplot()
+    ax.pie([above, below], labels=[above_label, below_label], autopct='%1.1f%%', colors=['green', 'red'])
+    ax.set_title(title)
+    ax.axis('equal')
+    fig.tight_layout()
+    fig.savefig(save_path)
+
+def plot_trend_chart(series, benchmark, ylabel, title, save_path):
+    """
+    Plot and save an org-wide metric over past runs: the mean as a line,
+    the min-max range shaded, and the share of repos below the benchmark
+    on a second axis.
+    series: [(run_ts, repos, mean, minimum, maximum, below_benchmark)] from SnapshotStore.org_series
+    """
+    import numpy as np
+
+    run_ts, repos, mean, low, high, below = zip(*series)
+    dates = [datetime.strptime(ts, RUN_TS_FORMAT) for ts in run_ts]
+    share_below = np.asarray(below, dtype=float) / np.asarray(repos, dtype=float) * 100
+
+    fig = new_figure((10, 6))
+    ax = fig.add_subplot()
+    ax.fill_between(dates, low, high, color='tab:blue', alpha=0.15, label='Min-max range')
+    ax.plot(dates, mean, color='tab:blue', marker='o', label='Mean')
+    ax.axhline(benchmark, color='orange', linestyle='dashed', linewidth=2, label=f'Benchmark: {benchmark}%')
+    ax.set_ylim(0, 100)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.legend(loc='upper left')
+
+    share_ax = ax.twinx()
+    share_ax.plot(dates, share_below, color='red', linestyle='dotted', marker='x')
+    share_ax.set_ylim(0, 100)
+    share_ax.set_ylabel('Repositories below benchmark (%)', color='red')
+
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    fig.savefig(save_path)
 
-    plt.figure(figsize=(5,5))
-    plt.pie([above, below], labels=[above_label, below_label], autopct='%1.1f%%', colors=['green', 'red'])
-    plt.title(title)
-    plt.axis('equal')
-    plt.tight_layout()
-    plt.savefig(save_path)
-    plt.close()
+def plot_change_summary(changes, title, save_path):
+    """Plot and save a horizontal bar chart counting each kind of change."""
+    change_counts = Counter(change for _, change, _, _ in changes)
+    fig = new_figure((8, max(3, len(change_counts) * 0.5)))
+    ax = fig.add_subplot()
+    ax.barh(list(change_counts.keys()), list(change_counts.values()), color='tab:blue')
+    ax.set_xlabel('Repositories')
+    ax.set_title(title if changes else f"{title}: no changes")
+    fig.tight_layout()
+    fig.savefig(save_path)
+
+def render_charts(chart_jobs, workers=CHART_WORKERS):
+    """
+    Render charts given as (plot_function, args, kwargs) tuples.
+    With more than one worker, each chart is drawn in its own process.
+    """
+    workers = min(workers or os.cpu_count() or 1, len(chart_jobs))
+    if workers <= 1:
+        for plot, args, kwargs in chart_jobs:
+            plot(*args, **kwargs)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(plot, *args, **kwargs) for plot, args, kwargs in chart_jobs]
+        for future in futures:
+            future.result()
 
 # ------------------------ EXCEL EXPORT FUNCTION ------------------------
 
-def export_to_excel_with_images(csv_file, excel_file, image_paths):
+def write_sheet(ws, header, rows):
+    """Stream a header and rows into a write-only worksheet. Returns the row count."""
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    header_cells = []
+    for column in header:
+        cell = WriteOnlyCell(ws, value=column)
+        cell.font = Font(bold=True)
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    count = 0
+    for row in rows:
+        ws.append(row)
+        count += 1
+    return count
+
+def excel_rows(frame):
+    """Yield frame rows as plain tuples, with NaN cells written as empty cells."""
+    cells = frame.astype(object).where(frame.notna(), None)
+    return cells.itertuples(index=False, name=None)
+
+def frame_records(frame):
+    """Yield frame rows as dicts keyed by column name, with NaN cells as None."""
+    columns = list(frame.columns)
+    for row in excel_rows(frame):
+        yield dict(zip(columns, row))
+
+def export_to_excel_with_images(frame, excel_file, image_paths, extra_sheets=None):
     """
-    Export CSV data to Excel and embed images below the table.
+    Export the report frame to Excel and embed images below the table, in a
+    single streaming pass through a write-only workbook.
+    frame: Report DataFrame, as from load_csv_frame or frame_from_records.
     image_paths: List of (image_path, row_offset) tuples.
+    extra_sheets: Optional {sheet_name: (header, rows)}; rows may be any
+    iterable, so large sheets (e.g. per-repo history) are never held in memory.
     """
-    df = pd.read_csv(csv_file)
-    df.to_excel(excel_file, index=False)
+    from openpyxl import Workbook
+    from openpyxl.drawing.image import Image as XLImage
 
-    wb = load_workbook(excel_file)
-    ws = wb.active
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    row_count = write_sheet(ws, list(frame.columns), excel_rows(frame))
 
-    img_start_row = len(df) + 3  # Leave a couple of empty rows after table
+    img_start_row = row_count + 3  # Leave a couple of empty rows after table
 
-    for idx, (img_path, row_offset) in enumerate(image_paths):
-        cell_ref = f"B{img_start_row + row_offset}"
+    for img_path, row_offset in image_paths:
         img = XLImage(img_path)
-        ws.add_image(img, cell_ref)
+        img.anchor = f"B{img_start_row + row_offset}"
+        ws.add_image(img)
+
+    for sheet_name, (sheet_header, sheet_rows) in (extra_sheets or {}).items():
+        write_sheet(wb.create_sheet(sheet_name[:31]), sheet_header, sheet_rows)
 
     wb.save(excel_file)
     print(f"Excel report generated: {excel_file} with charts embedded.")
 
+def export_changes_to_excel(changes, excel_file, image_path):
+    """Export a change list to Excel with its summary chart below the table."""
+    from openpyxl import Workbook
+    from openpyxl.drawing.image import Image as XLImage
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Changes")
+    row_count = write_sheet(ws, CHANGE_HEADER, changes)
+    img = XLImage(image_path)
+    img.anchor = f"B{row_count + 3}"
+    ws.add_image(img)
+    wb.save(excel_file)
+    print(f"Change report generated: {excel_file}")
+
 # ------------------------ MAIN FUNCTION ------------------------
 
-def main():
-    # Load config benchmarks
-    coverage_benchmark, issue_benchmark = load_config(CONFIG_FILE)
+def metric_chart_jobs(repo_names, metric_values, benchmark, ylabel, title, save_path, chart_config):
+    """
+    Plan the per-repository charts for one metric.
+    Up to bar_chart_max_repos repos get the single bar chart at save_path.
+    Larger sets get a histogram at save_path, a worst-N chart, and optionally
+    pages of bar_chart_page_size bars written next to it (pages are not
+    embedded in Excel).
+    Returns: (chart_jobs, excel_image_paths)
+    """
+    if len(repo_names) <= chart_config["bar_chart_max_repos"]:
+        job = (plot_metric_bar_chart, (repo_names, metric_values, benchmark), dict(
+            ylabel=ylabel, title=title, save_path=save_path
+        ))
+        return [job], [save_path]
 
-    # Load CSV data
-    repo_names, grades, coverages, issue_percentages = load_csv_data(CSV_FILE)
+    worst_path = f"{os.path.splitext(save_path)[0]}_worst.png"
+    jobs = [
+        (plot_metric_histogram, (metric_values, benchmark), dict(
+            xlabel=ylabel, title=title, save_path=save_path,
+            bins=chart_config["histogram_bins"]
+        )),
+        (plot_worst_below_benchmark, (repo_names, metric_values, benchmark), dict(
+            ylabel=ylabel, title=title, save_path=worst_path,
+            worst_n=chart_config["worst_n"]
+        )),
+    ]
 
-    # Generate and save charts
-    plot_grade_pie_chart(grades, PNG_GRADE_PIE)
+    # Drop pages left over from an earlier, larger run before writing new ones
+    for stale_page in glob.glob(paged_chart_path(save_path, "*")):
+        os.remove(stale_page)
+    page_size = chart_config["bar_chart_page_size"]
+    if page_size > 0:
+        for page, start in enumerate(range(0, len(repo_names), page_size), 1):
+            end = start + page_size
+            jobs.append((plot_metric_bar_chart, (repo_names[start:end], metric_values[start:end], benchmark), dict(
+                ylabel=ylabel, title=f"{title} (page {page})",
+                save_path=paged_chart_path(save_path, page)
+            )))
+    return jobs, [save_path, worst_path]
 
-    plot_metric_bar_chart(
+def trend_chart_jobs(store, snapshot_stage, coverage_benchmark, issue_benchmark, since):
+    """
+    Plan trend charts for each metric with at least two `snapshot_stage` runs in the snapshot store.
+    Returns: (chart_jobs, excel_image_paths)
+    """
+    jobs = []
+    images = []
+    for metric, benchmark, save_path, label in [
+        ("coverage percentage", coverage_benchmark, PNG_COVERAGE_TREND, "Coverage"),
+        ("issue percentage", issue_benchmark, PNG_ISSUE_TREND, "Issue"),
+    ]:
+        series = store.org_series(metric, benchmark=benchmark, since=since, stage=snapshot_stage)
+        if len(series) < 2:
+            continue
+        jobs.append((plot_trend_chart, (series, benchmark), dict(
+            ylabel=f"{label} Percentage",
+            title=f"{label} Percentage Trend ({len(series)} runs)",
+            save_path=save_path
+        )))
+        images.append(save_path)
+    return jobs, images
+
+def render_reports(frame, coverage_benchmark, issue_benchmark, chart_config=None, store=None, snapshot_stage=None):
+    """
+    Render every chart and the Excel report from one report frame.
+    With a SnapshotStore, trend charts and a per-repo History sheet of the
+    `snapshot_stage` runs are added.
+    """
+    chart_config = {**DEFAULT_CHART_CONFIG, **(chart_config or {})}
+    repo_names, grades, coverages, issue_percentages = chart_columns(frame)
+
+    coverage_title = f"Repositories Coverage vs {coverage_benchmark}% Benchmark"
+    issue_title = f"Repositories Issue % vs {issue_benchmark}% Benchmark"
+    print_benchmark_summary(coverages, coverage_benchmark, coverage_title)
+    print_benchmark_summary(issue_percentages, issue_benchmark, issue_title)
+
+    coverage_jobs, coverage_images = metric_chart_jobs(
         repo_names, coverages, coverage_benchmark,
         ylabel="Coverage Percentage",
         title="Coverage Percentage by Repository",
-        save_path=PNG_COVERAGE_BAR
+        save_path=PNG_COVERAGE_BAR,
+        chart_config=chart_config
     )
-    plot_benchmark_pie_chart(
-        coverages, coverage_benchmark,
-        above_label="Above/Eq Benchmark",
-        below_label="Below Benchmark",
-        title=f"Repositories Coverage vs {coverage_benchmark}% Benchmark",
-        save_path=PNG_BENCHMARK_PIE
-    )
-
-    plot_metric_bar_chart(
+    issue_jobs, issue_images = metric_chart_jobs(
         repo_names, issue_percentages, issue_benchmark,
         ylabel="Issue Percentage",
         title="Issue Percentage by Repository",
-        save_path=PNG_ISSUE_BAR
-    )
-    plot_benchmark_pie_chart(
-        issue_percentages, issue_benchmark,
-        above_label="Above/Eq Issue Benchmark",
-        below_label="Below Issue Benchmark",
-        title=f"Repositories Issue % vs {issue_benchmark}% Benchmark",
-        save_path=PNG_ISSUE_PIE
+        save_path=PNG_ISSUE_BAR,
+        chart_config=chart_config
     )
 
+    trend_jobs, trend_images = [], []
+    extra_sheets = {}
+    if store is not None:
+        since = since_timestamp(chart_config["trend_days"])
+        trend_jobs, trend_images = trend_chart_jobs(
+            store, snapshot_stage, coverage_benchmark, issue_benchmark, since
+        )
+        extra_sheets["History"] = (
+            ["repo", "run", "grade", "coverage percentage", "issue percentage"],
+            store.iter_history(since, stage=snapshot_stage)
+        )
+
+    # Generate and save charts
+    with stage("chart_render"):
+        render_charts([
+            (plot_grade_pie_chart, (grades, PNG_GRADE_PIE), {}),
+            *coverage_jobs,
+            (plot_benchmark_pie_chart, (coverages, coverage_benchmark), dict(
+                above_label="Above/Eq Benchmark",
+                below_label="Below Benchmark",
+                title=coverage_title,
+                save_path=PNG_BENCHMARK_PIE
+            )),
+            *issue_jobs,
+            (plot_benchmark_pie_chart, (issue_percentages, issue_benchmark), dict(
+                above_label="Above/Eq Issue Benchmark",
+                below_label="Below Issue Benchmark",
+                title=issue_title,
+                save_path=PNG_ISSUE_PIE
+            )),
+            *trend_jobs,
+        ])
+
     # Export to Excel and embed images, spaced out to avoid congestion
-    image_paths = [
-        (PNG_GRADE_PIE, 0),
-        (PNG_COVERAGE_BAR, 30),
-        (PNG_BENCHMARK_PIE, 65),
-        (PNG_ISSUE_BAR, 100),
-        (PNG_ISSUE_PIE, 135),
-    ]
-    export_to_excel_with_images(CSV_FILE, EXCEL_FILE, image_paths)
+    images = [PNG_GRADE_PIE, *coverage_images, PNG_BENCHMARK_PIE, *issue_images, PNG_ISSUE_PIE, *trend_images]
+    image_paths = []
+    row_offset = 0
+    for img_path in images:
+        image_paths.append((img_path, row_offset))
+        row_offset += 30 if img_path == PNG_GRADE_PIE else 35
+    with stage("excel_export"):
+        export_to_excel_with_images(frame, EXCEL_FILE, image_paths, extra_sheets)
+
+def render_delta(previous_run, changes):
+    """Render only the change report: a summary chart and the list of changes."""
+    title = f"Changes since {previous_run}" if previous_run else "No earlier run of the same orgs"
+    with stage("chart_render"):
+        plot_change_summary(changes, title, PNG_CHANGES)
+    with stage("excel_export"):
+        export_changes_to_excel(changes, CHANGES_EXCEL_FILE, PNG_CHANGES)
+
+def render_run(frame, store, run_ts, snapshot_stage, coverage_benchmark, issue_benchmark, chart_config=None, delta=False):
+    """
+    Diff this run's `snapshot_stage` snapshot against the previous run, then render.
+    With delta=True the change report is always rendered, and the full
+    charts and Excel report are only redrawn when some repo changed (or
+    there is no earlier run or no existing report to keep).
+    """
+    with stage("diff"):
+        previous_run, _, changes, changed_repos = report_changes(
+            store, snapshot_stage, coverage_benchmark, issue_benchmark, run_ts
+        )
+    if delta:
+        if previous_run is None and not store.latest_runs(snapshot_stage, before=run_ts, count=1):
+            print(
+                f"⚠️ {store.path} holds no earlier '{snapshot_stage}' run. If the store was lost, restore "
+                f"the snapshot-store artifact or rebuild it with snapshot_store.py --import-reports."
+            )
+        render_delta(previous_run, changes)
+        if previous_run is not None and not changed_repos and os.path.exists(EXCEL_FILE):
+            print(f"✅ No repositories changed since {previous_run}; full report left as it is.")
+            return
+    render_reports(frame, coverage_benchmark, issue_benchmark, chart_config, store, snapshot_stage)
+
+def main():
+    parser = argparse.ArgumentParser(description="Render Codacy charts and the Excel report.")
+    parser.add_argument(
+        "--delta", action="store_true",
+        help="render the change report, and the full report only if something changed"
+    )
+    parser.add_argument(
+        "--input", default=CSV_FILE,
+        help="report to render: CSV (default: reports/codacy_final.csv) or a .parquet/.arrow/.ndjson sink"
+    )
+    args = parser.parse_args()
+
+    # Load config benchmarks
+    coverage_benchmark, issue_benchmark = load_config(CONFIG_FILE)
+
+    with instrumented("final_reports"):
+        # Load the report once; the same frame feeds the charts and the Excel export
+        with stage("load"):
+            frame = load_report_frame(args.input)
+        records = list(frame_records(frame))
+        chart_config = load_chart_config(CONFIG_FILE)
+        with SnapshotStore() as store:
+            # Re-rendering an unchanged report must not add a copy of it to the trends
+            previous_run = store.matching_run("report", records)
+            if previous_run is None:
+                run_ts = run_timestamp()
+                store.append_records(run_ts, "report", records)
+                render_run(
+                    frame, store, run_ts, "report", coverage_benchmark, issue_benchmark,
+                    chart_config, delta=args.delta
+                )
+                return
+
+            print(f"ℹ️ {args.input} has not changed since the report run {previous_run}; no snapshot recorded.")
+            if args.delta:
+                render_delta(previous_run, [])
+                if os.path.exists(EXCEL_FILE):
+                    print(f"✅ No repositories changed since {previous_run}; full report left as it is.")
+                    return
+            render_reports(frame, coverage_benchmark, issue_benchmark, chart_config, store, "report")
 
 # ------------------------ ENTRY POINT ------------------------
 
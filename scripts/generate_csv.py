@@ -1,8 +1,14 @@
 import os
-import requests
 import csv
-import base64
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+import argparse
+from http_client import HttpClient, iter_pages
+from http_cache import HttpCache
+from instrumentation import instrumented, stage, timed
+from repo_records import RepoRecord, repo_records
+from repo_index import RepoIndex, is_codacy_integrated
+from codacy_search import codacy_headers, index_codacy_org
+from report_sinks import SOC_SCHEMA, write_sinks
 
 # Configuration Section 
 
@@ -16,45 +22,150 @@ GITHUB_ORG = os.getenv("ORG_GITHUB")
 if not GITHUB_ORG:
     raise Exception("🚨 Missing required environment variable: ORG_GITHUB")
 
+# API root, overridable to point at GitHub Enterprise or a local mock server
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
 # Set up the HTTP headers for GitHub API requests
 GITHUB_HEADERS = {
     "Authorization": f"Bearer {GITHUB_TOKEN}",
     "Accept": "application/vnd.github+json"
 }
 
+# Optional: with a Codacy token, repos Codacy follows skip the README check
+CODACY_TOKEN = os.getenv("CODACY_API_TOKEN")
+
+# Text that marks a README as carrying a Codacy badge
+CODACY_BADGE_MARKERS = ("codacy.com", "shields.io/codacy")
+
+# Repositories fetched per GraphQL query (GitHub allows at most 100)
+GRAPHQL_PAGE_SIZE = int(os.getenv("GRAPHQL_PAGE_SIZE", "50"))
+
+# One query returns name, URL, default branch and README text for a page of repositories
+GRAPHQL_REPOS_QUERY = """
+query($org: String!, $first: Int!, $after: String) {
+  organization(login: $org) {
+    repositories(first: $first, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        databaseId
+        url
+        owner { login }
+        pushedAt
+        updatedAt
+        defaultBranchRef { name }
+        readme: object(expression: "HEAD:README.md") { ... on Blob { text } }
+        readmeLower: object(expression: "HEAD:readme.md") { ... on Blob { text } }
+      }
+    }
+  }
+}
+"""
+
 # Helper Functions 
 
-def get_github_repos(org):
+async def iter_github_repos(client, org):
+    """
+    Yield batches of repositories in the specified GitHub organization as
+    each page arrives, projected onto RepoRecords. The page count comes from
+    the Link header of page 1 and the remaining pages are fetched concurrently.
+    """
+    url = f"{GITHUB_API_URL}/orgs/{org}/repos?per_page=100"
+    async for batch in iter_pages(client, url, headers=GITHUB_HEADERS):
+        yield repo_records(batch, org)
+
+async def get_github_repos(client, org):
     """
     Fetch all repositories in the specified GitHub organization.
     Handles pagination to retrieve all repositories.
     """
     repos = []
-    page = 1
+    async for batch in iter_github_repos(client, org):
+        repos.extend(batch)
+    return repos
+
+async def iter_github_repos_graphql(client, org):
+    """
+    Yield batches of repositories using the GraphQL API, GRAPHQL_PAGE_SIZE
+    repositories per query with cursor pagination.
+    The README is checked for a Codacy badge as each page is parsed and only
+    the verdict is kept (RepoRecord.readme_badge), not the README text.
+    Only README.md and readme.md come back inline; a repo with neither keeps
+    readme_badge None and gets the REST /readme check, which accepts any
+    README variant, so both modes give the same answer.
+    """
+    cursor = None
     while True:
-        url = f"https://api.github.com/orgs/{org}/repos?per_page=100&page={page}"
-        resp = requests.get(url, headers=GITHUB_HEADERS)
+        variables = {"org": org, "first": GRAPHQL_PAGE_SIZE, "after": cursor}
+        resp = await client.post(
+            f"{GITHUB_API_URL}/graphql",
+            headers=GITHUB_HEADERS,
+            json={"query": GRAPHQL_REPOS_QUERY, "variables": variables}
+        )
         if resp.status_code != 200:
-            print(f"❌ Failed to fetch repos (status {resp.status_code}): {resp.text}")
-            break
-        batch = resp.json()
-        if not batch:
+            raise Exception(f"🚨 GraphQL query failed (status {resp.status_code}): {resp.text}")
+        data = resp.json()
+        if data.get("errors"):
+            raise Exception(f"🚨 GraphQL query failed: {data['errors']}")
+
+        repositories = data["data"]["organization"]["repositories"]
+        batch = []
+        for node in repositories["nodes"]:
+            readme = node.get("readme") or node.get("readmeLower")
+            readme_badge = None
+            if readme is not None:
+                readme_badge = "yes" if has_codacy_badge(readme.get("text") or "") else "no"
+            name = node.get("name", "")
+            owner = (node.get("owner") or {}).get("login") or org
+            batch.append(RepoRecord(
+                name=name,
+                owner=owner,
+                full_name=f"{owner}/{name}",
+                html_url=node.get("url", ""),
+                default_branch=(node.get("defaultBranchRef") or {}).get("name", ""),
+                pushed_at=node.get("pushedAt"),
+                updated_at=node.get("updatedAt"),
+                id=node.get("databaseId"),
+                readme_badge=readme_badge
+            ))
+        yield batch
+
+        page_info = repositories["pageInfo"]
+        if not page_info["hasNextPage"]:
             break
-        repos.extend(batch)
-        page += 1
-    return repos
+        cursor = page_info["endCursor"]
 
-def get_custom_properties(owner, repo):
+async def get_custom_properties(client, owner, repo):
     """
     Fetch custom properties from the GitHub API for a specific repository.
-    Returns the raw JSON response or None if the request fails.
+    Returns the raw JSON response, or None if the repository is not found.
+    Raises if the request still fails after retries, so a throttled repo is
+    never mistaken for a non-SOC one.
     """
-    url = f"https://api.github.com/repos/{owner}/{repo}/properties/values"
-    resp = requests.get(url, headers=GITHUB_HEADERS)
-    if resp.status_code != 200:
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/properties/values"
+    resp = await client.get(url, headers=GITHUB_HEADERS)
+    if resp.status_code == 404:
         return None
+    if resp.status_code != 200:
+        raise Exception(f"🚨 Failed to fetch custom properties for {owner}/{repo} (status {resp.status_code})")
     return resp.json()
 
+async def get_org_custom_properties(client, org):
+    """
+    Fetch custom property values for every repository in the organization.
+    Uses the org-level listing (100 repositories per page) instead of one
+    request per repository.
+    Returns a dict mapping lowercased "owner/name" to the list of properties.
+    """
+    index = {}
+    url = f"{GITHUB_API_URL}/orgs/{org}/properties/values?per_page=100"
+    async for batch in iter_pages(client, url, headers=GITHUB_HEADERS):
+        for item in batch:
+            full_name = item.get("repository_full_name")
+            if full_name:
+                index[full_name.lower()] = item.get("properties", [])
+    return index
+
 def is_soc_compliant(custom_properties):
     """
     Checks if the repository has the custom property 'Compliance' set to 'soc'.
@@ -77,25 +188,68 @@ def is_soc_compliant(custom_properties):
                 return True
     return False
 
-def check_codacy_badge(owner, repo):
+def has_codacy_badge(readme_text):
+    """Checks README text for a Codacy badge or codacy.com reference."""
+    readme_text = readme_text.lower()
+    return any(marker in readme_text for marker in CODACY_BADGE_MARKERS)
+
+async def stream_has_codacy_badge(resp):
+    """
+    Scan a streamed README for a Codacy badge, stopping the download at the
+    first match. A short tail of each chunk is kept so a marker split across
+    two chunks is still found.
+    """
+    overlap = max(len(marker) for marker in CODACY_BADGE_MARKERS) - 1
+    tail = ""
+    async for chunk in resp.aiter_text():
+        window = tail + chunk.lower()
+        if any(marker in window for marker in CODACY_BADGE_MARKERS):
+            return True
+        tail = window[-overlap:]
+    return False
+
+async def check_codacy_badge(client, owner, repo):
     """
     Checks if the README contains a Codacy badge or codacy.com reference.
     Returns "yes" if found, "no" otherwise.
+    The raw README is streamed, and the verdict is memoized against its
+    ETag so an unchanged README comes back as a bodiless 304.
     """
-    url = f"https://api.github.com/repos/{owner}/{repo}/readme"
-    resp = requests.get(url, headers=GITHUB_HEADERS)
-    if resp.status_code != 200:
-        return "no"
-    content = resp.json().get("content", "")
-    if not content:
-        return "no"
+    full_name = f"{owner}/{repo}".lower()
+    memo = client.cache.memo_get("readme_badge", full_name) if client.cache else None
+    headers = {**GITHUB_HEADERS, "Accept": "application/vnd.github.raw"}
+    if memo:
+        headers["If-None-Match"] = memo["etag"]
+
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/readme"
+    resp = await client.get(url, headers=headers, stream=True)
     try:
-        readme_text = base64.b64decode(content).decode("utf-8", errors="ignore")
-    except Exception:
-        return "no"
-    if "codacy.com" in readme_text.lower() or "shields.io/codacy" in readme_text.lower():
-        return "yes"
-    return "no"
+        if resp.status_code == 304 and memo:
+            return memo["badge"]
+        if resp.status_code == 404:
+            return "no"
+        if resp.status_code != 200:
+            raise Exception(f"🚨 Failed to fetch README for {owner}/{repo} (status {resp.status_code})")
+        badge = "yes" if await stream_has_codacy_badge(resp) else "no"
+    finally:
+        await resp.aclose()
+
+    etag = resp.headers.get("ETag")
+    if client.cache and etag:
+        client.cache.memo_set("readme_badge", full_name, {"etag": etag, "badge": badge})
+    return badge
+
+async def load_codacy_index(client, org, index):
+    """
+    Page the org's Codacy repository search into `index`. A failed search is
+    reported and leaves the README checks to answer on their own.
+    """
+    try:
+        count = await index_codacy_org(client, org, index, codacy_headers(CODACY_TOKEN))
+    except Exception as e:
+        print(f"⚠️ Codacy search for {org} failed, checking READMEs only: {e}")
+        return
+    print(f"🔎 Codacy repositories found: {count}")
 
 def export_to_csv(rows):
     """
@@ -107,61 +261,81 @@ def export_to_csv(rows):
     reports_dir = os.path.join(script_dir, '..', 'reports')
     os.makedirs(reports_dir, exist_ok=True)  # Ensure reports directory exists
     filename = os.path.join(reports_dir, "soc_compliant_repos2.csv")
+    header = [
+        "S no.", "name", "repo url", "default branch",
+        "codacy integration", "custom properties"
+    ]
+    numbered_rows = [[idx] + row for idx, row in enumerate(rows, 1)]
     with open(filename, mode="w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow([
-            "S no.", "name", "repo url", "default branch",
-            "codacy integration", "custom properties"
-        ])
-        for idx, row in enumerate(rows, 1):
-            writer.writerow([idx] + row)
+        writer.writerow(header)
+        writer.writerows(numbered_rows)
     print(f"✅ CSV saved: {filename}")
+    write_sinks(filename, header, numbered_rows, SOC_SCHEMA)
 
 # --------------------- Main Logic ----------------------------------
 
-def main():
+async def audit_org(client, org, graphql=False):
     """
-    The main function orchestrates fetching, filtering, and exporting
-    SOC-compliant repositories in a GitHub organization.
+    Fetch, filter, and export SOC-compliant repositories in a GitHub
+    organization, with all requests sharing one client.
+    With graphql=True, repositories and their READMEs come from batched
+    GraphQL queries instead of the REST listing plus one README call per repo.
     """
 
-    org = GITHUB_ORG
+    # Load custom properties for the whole organization in bulk, alongside the repo listing
+    properties_task = asyncio.create_task(timed("property_fetch", get_org_custom_properties(client, org)))
+
+    # With a Codacy token, repos Codacy follows are integrated in either listing
+    # mode without a README check. The search starts with the first SOC repo,
+    # so it only runs when a row needs it
+    codacy_index = RepoIndex()
+    codacy_task = None
 
-    # Fetch all repositories in the organization
-    github_repos = get_github_repos(org)
-    print(f"🔎 Total GitHub repos found: {len(github_repos)}")
+    def codacy_lookup():
+        nonlocal codacy_task
+        if codacy_task is None:
+            codacy_task = asyncio.create_task(timed("codacy_projects", load_codacy_index(client, org, codacy_index)))
+        return codacy_task
 
-    def build_row(repo):
+    async def build_row(repo):
         """
         Build a CSV row for a repository if it is SOC-compliant.
         Returns the row as a list or None if not compliant.
         """
-        name = repo.get("name", "")
-        owner = repo.get("owner", {}).get("login", org)
-        repo_url = repo.get("html_url", "")
-        default_branch = repo.get("default_branch", "")
-
-        # Fetch custom properties and check SOC compliance
-        custom_props = get_custom_properties(owner, name)
+        # Look up custom properties and check SOC compliance
+        custom_properties = await properties_task
+        custom_props = custom_properties.get(repo.full_name.lower())
         if is_soc_compliant(custom_props):
-            codacy_integration = check_codacy_badge(owner, name)
+            if CODACY_TOKEN:
+                await codacy_lookup()
+            if is_codacy_integrated(codacy_index.codacy_item(repo)):
+                codacy_integration = "yes"
+            elif repo.readme_badge is not None:
+                codacy_integration = repo.readme_badge
+            else:
+                codacy_integration = await timed("readme_check", check_codacy_badge(client, repo.owner, repo.name))
             return [
-                name,
-                repo_url,
-                default_branch,
+                repo.name,
+                repo.html_url,
+                repo.default_branch,
                 codacy_integration,
                 "SOC"
             ]
         return None  # Exclude non-SOC-compliant repos
 
-    # Process repositories in parallel to speed up the workflow
-    soc_rows = []
-    with ThreadPoolExecutor(max_workers=6) as executor:
-        futures = [executor.submit(build_row, repo) for repo in github_repos]
-        for future in as_completed(futures):
-            row = future.result()
-            if row:
-                soc_rows.append(row)
+    # Start processing each page of repositories as soon as it arrives,
+    # so README checks overlap with the rest of the listing
+    iter_repos = iter_github_repos_graphql if graphql else iter_github_repos
+    tasks = []
+    with stage("listing"):
+        async for batch in iter_repos(client, org):
+            tasks.extend(asyncio.create_task(build_row(repo)) for repo in batch)
+    print(f"🔎 Total GitHub repos found: {len(tasks)}")
+
+    results = await asyncio.gather(*tasks)
+    soc_rows = [row for row in results if row]
+    print(f"🔎 Repos with custom properties: {len(properties_task.result())}")
 
     # Sort the output alphabetically by repo name for professional presentation
     soc_rows.sort(key=lambda x: x[0].lower())
@@ -171,6 +345,26 @@ def main():
     else:
         export_to_csv(soc_rows)
 
+async def run(graphql=False):
+    async with HttpClient(cache=HttpCache()) as client:
+        await audit_org(client, GITHUB_ORG, graphql=graphql)
+    print(client.stats.summary())
+    print(client.cache.summary())
+
+def main():
+    """
+    The main function orchestrates fetching, filtering, and exporting
+    SOC-compliant repositories in a GitHub organization.
+    """
+    parser = argparse.ArgumentParser(description="Export SOC-compliant repositories to CSV.")
+    parser.add_argument(
+        "--graphql", action="store_true",
+        help="fetch repositories and READMEs with batched GraphQL queries"
+    )
+    args = parser.parse_args()
+    with instrumented("generate_csv"):
+        asyncio.run(run(graphql=args.graphql))
+
 # Entry Point 
 
 if __name__ == "__main__":
@@ -1,8 +1,18 @@
 import os
-import requests
 import csv
+import json
+import asyncio
+import argparse
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from http_client import HttpClient, iter_pages, iter_numbered_pages
+from http_cache import HttpCache
+from snapshot_store import SnapshotStore, run_timestamp
+from instrumentation import instrumented, stage, timed
+from repo_records import RepoRecord, repo_records
+from repo_index import RepoIndex, is_codacy_integrated
+from report_sinks import SOC_SCHEMA, write_sinks
+from checkpoint import Journal
+from codacy_search import index_codacy_org
 
 # Configuration Section
 
@@ -14,10 +24,18 @@ GITHUB_ORG = os.getenv("ORG_GITHUB")
 if not GITHUB_ORG:
     raise Exception("🚨 Missing required environment variable: ORG_GITHUB")
 
+# ORG_GITHUB may list several orgs separated by commas; they are audited
+# concurrently over one client and merged into one report
+GITHUB_ORGS = [org.strip() for org in GITHUB_ORG.split(",") if org.strip()]
+
 CODACY_TOKEN = os.getenv("CODACY_API_TOKEN")
 if not CODACY_TOKEN:
     raise Exception("🚨 Missing required environment variable: CODACY_API_TOKEN")
 
+# API roots, overridable to point at GitHub Enterprise or a local mock server
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+CODACY_API_URL = os.getenv("CODACY_API_URL", "https://app.codacy.com/api/v3").rstrip("/")
+
 GITHUB_HEADERS = {
     "Authorization": f"Bearer {GITHUB_TOKEN}",
     "Accept": "application/vnd.github+json"
@@ -28,31 +46,58 @@ CODACY_HEADERS = {
     "Accept": "application/json"
 }
 
+# Per-repo state from the previous run, used by --incremental
+INVENTORY_DIR = os.getenv(
+    "INVENTORY_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache")
+)
+
+# Above this many new or modified repos, --incremental uses the org-wide lookups instead
+INCREMENTAL_BULK_THRESHOLD = int(os.getenv("INCREMENTAL_BULK_THRESHOLD", "100"))
+
 # Helper Functions
 
-def get_github_repos(org):
-    repos = []
-    page = 1
-    while True:
-        url = f"https://api.github.com/orgs/{org}/repos?per_page=100&page={page}"
-        resp = requests.get(url, headers=GITHUB_HEADERS)
-        if resp.status_code != 200:
-            print(f"❌ Failed to fetch repos (status {resp.status_code}): {resp.text}")
-            break
-        batch = resp.json()
-        if not batch:
-            break
-        repos.extend(batch)
-        page += 1
-    return repos
-
-def get_custom_properties(owner, repo):
-    url = f"https://api.github.com/repos/{owner}/{repo}/properties/values"
-    resp = requests.get(url, headers=GITHUB_HEADERS)
-    if resp.status_code != 200:
+async def iter_github_repos(client, org, journal=None):
+    """
+    Yield each page of the org's repositories as compact RepoRecords.
+    With a journal, every page is recorded as it arrives; on resume the
+    recorded pages are replayed and only the missing ones are fetched.
+    """
+    url = f"{GITHUB_API_URL}/orgs/{org}/repos?per_page=100"
+    if journal is None:
+        async for batch in iter_pages(client, url, headers=GITHUB_HEADERS):
+            yield repo_records(batch, org)
+        return
+
+    recorded = journal.entries("repos_page", org=org)
+    for entry in recorded:
+        yield [RepoRecord(*fields) for fields in entry["repos"]]
+    skip = {entry["page"] for entry in recorded}
+    last = recorded[0]["last"] if recorded else None
+    async for page, last, batch in iter_numbered_pages(client, url, skip=skip, last=last, headers=GITHUB_HEADERS):
+        records = repo_records(batch, org)
+        journal.record("repos_page", org=org, page=page, last=last, repos=[list(record) for record in records])
+        yield records
+
+async def get_custom_properties(client, owner, repo):
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/properties/values"
+    resp = await client.get(url, headers=GITHUB_HEADERS)
+    if resp.status_code == 404:
         return None
+    if resp.status_code != 200:
+        raise Exception(f"🚨 Failed to fetch custom properties for {owner}/{repo} (status {resp.status_code})")
     return resp.json()
 
+async def get_org_custom_properties(client, org):
+    index = {}
+    url = f"{GITHUB_API_URL}/orgs/{org}/properties/values?per_page=100"
+    async for batch in iter_pages(client, url, headers=GITHUB_HEADERS):
+        for item in batch:
+            full_name = item.get("repository_full_name")
+            if full_name:
+                index[full_name.lower()] = item.get("properties", [])
+    return index
+
 def is_soc_compliant(custom_properties):
     if not custom_properties:
         return False
@@ -69,28 +114,63 @@ def is_soc_compliant(custom_properties):
                 return True
     return False
 
-def get_codacy_projects(org):
-    projects = set()
-    page = 1
-    while True:
-        url = f"https://api.codacy.com/2.0/organizations/{org}/projects?page={page}&per_page=100"
-        resp = requests.get(url, headers=CODACY_HEADERS)
-        if resp.status_code == 404:
-            print(f"❌ Codacy organization {org} not found or no access.")
-            break
-        if resp.status_code != 200:
-            print(f"❌ Failed to fetch Codacy projects (status {resp.status_code}): {resp.text}")
-            break
-        data = resp.json()
-        projects_on_page = data.get("projects", [])
-        if not projects_on_page:
-            break
-        for proj in projects_on_page:
-            repo_full_name = proj.get("repositoryFullName") or proj.get("name")
-            if repo_full_name and "/" in repo_full_name:
-                projects.add(repo_full_name.lower())
-        page += 1
-    return projects
+async def is_codacy_project(client, owner, repo):
+    url = f"{CODACY_API_URL}/organizations/gh/{owner}/repositories/{repo}"
+    resp = await client.get(url, headers=CODACY_HEADERS)
+    if resp.status_code == 404:
+        return False
+    if resp.status_code != 200:
+        raise Exception(f"🚨 Failed to fetch Codacy repository {owner}/{repo} (status {resp.status_code})")
+    # Same rule as a full run: the repository is the object search results nest under "repository"
+    return is_codacy_integrated({"repository": resp.json().get("data") or {}})
+
+def inventory_path(org):
+    return os.path.join(INVENTORY_DIR, f"soc_inventory_{org.lower()}.json")
+
+def load_inventory(org):
+    path = inventory_path(org)
+    if not os.path.exists(path):
+        print(f"⚠️ No previous snapshot at {path}, checking every repo.")
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["repos"]
+
+def save_inventory(org, inventory):
+    os.makedirs(INVENTORY_DIR, exist_ok=True)
+    snapshot = {
+        "org": org,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "repos": inventory
+    }
+    with open(inventory_path(org), mode="w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+
+def inventory_rows(org, inventory):
+    # Rows are tagged with their org here rather than in build_row, so
+    # inventories saved before multi-org support are still reusable
+    return [entry["row"] + [org] for entry in inventory.values() if entry["row"]]
+
+def inventory_entry(repo, row):
+    return {"pushed_at": repo.pushed_at, "updated_at": repo.updated_at, "row": row}
+
+def build_row(repo, custom_props, codacy_integrated):
+    if is_soc_compliant(custom_props):
+        return [
+            repo.name,
+            repo.html_url,
+            repo.default_branch,
+            "yes" if codacy_integrated else "no",
+            "SOC"
+        ]
+    return None
+
+async def recheck_repo(client, repo):
+    """Look up one repo's custom properties (and Codacy status if SOC) and build its row."""
+    custom_props = await timed("property_fetch", get_custom_properties(client, repo.owner, repo.name))
+    if not is_soc_compliant(custom_props):
+        return None
+    codacy_integrated = await timed("codacy_lookup", is_codacy_project(client, repo.owner, repo.name))
+    return build_row(repo, custom_props, codacy_integrated)
 
 def export_to_csv(rows):
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -101,61 +181,189 @@ def export_to_csv(rows):
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     filename = os.path.join(reports_dir, f"soc_compliant_repos2_{timestamp}.csv")
 
+    header = [
+        "S no.", "name", "repo url", "default branch",
+        "codacy integration", "custom properties", "org"
+    ]
+    numbered_rows = [[idx] + row for idx, row in enumerate(rows, 1)]
     with open(filename, mode="w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow([
-            "S no.", "name", "repo url", "default branch",
-            "codacy integration", "custom properties"
-        ])
-        for idx, row in enumerate(rows, 1):
-            writer.writerow([idx] + row)
+        writer.writerow(header)
+        writer.writerows(numbered_rows)
 
     print(f"✅ CSV saved: {filename}")
+    write_sinks(filename, header, numbered_rows, SOC_SCHEMA)
 
 # --------------------- Main Logic ----------------------------------
 
-def main():
-    org = GITHUB_ORG
-
-    codacy_projects = get_codacy_projects(org)
-    print(f"🔎 Codacy projects found: {len(codacy_projects)}")
-
-    github_repos = get_github_repos(org)
-    print(f"🔎 Total GitHub repos found: {len(github_repos)}")
-
-    def build_row(repo):
-        name = repo.get("name", "")
-        owner = repo.get("owner", {}).get("login", org)
-        repo_url = repo.get("html_url", "")
-        default_branch = repo.get("default_branch", "")
-        repo_full_name = f"{owner}/{name}".lower()
-
-        custom_props = get_custom_properties(owner, name)
-        if is_soc_compliant(custom_props):
-            codacy_integration = "yes" if repo_full_name in codacy_projects else "no"
-            return [
-                name,
-                repo_url,
-                default_branch,
-                codacy_integration,
-                "SOC"
-            ]
-        return None
+async def load_bulk_lookups(client, org, index, journal=None):
+    """
+    Add the org's Codacy repositories (one pass over the v3 search, which
+    the Codacy report reuses) and custom properties to the index, concurrently.
+    With a journal, both are checkpointed and taken from it on resume.
+    """
+    async def index_properties():
+        recorded = journal.entries("properties", org=org) if journal is not None else []
+        if recorded:
+            custom_properties = recorded[-1]["properties"]
+        else:
+            custom_properties = await get_org_custom_properties(client, org)
+            if journal is not None:
+                journal.record("properties", org=org, properties=custom_properties)
+        index.add_properties(custom_properties)
+        return len(custom_properties)
 
-    soc_rows = []
-    with ThreadPoolExecutor(max_workers=6) as executor:
-        futures = [executor.submit(build_row, repo) for repo in github_repos]
-        for future in as_completed(futures):
-            row = future.result()
-            if row:
-                soc_rows.append(row)
+    codacy_count, properties_count = await asyncio.gather(
+        timed("codacy_projects", index_codacy_org(client, org, index, CODACY_HEADERS, journal=journal)),
+        timed("property_fetch", index_properties())
+    )
+    print(f"🔎 {org}: Codacy repositories found: {codacy_count}")
+    print(f"🔎 {org}: repos with custom properties: {properties_count}")
+
+async def collect_soc_rows(client, org, incremental=False, index=None, journal=None):
+    """
+    List the org's repositories into `index` (a RepoIndex shared with the
+    caller, or a new one) and return its SOC rows. The listing, custom
+    properties and Codacy search fill the index concurrently; rows come from
+    one join once all three are in.
+    With a journal (see checkpoint.Journal), listing pages, org-wide lookups
+    and per-repo results are recorded as they finish, and whatever an
+    interrupted run recorded is reused instead of fetched again.
+    """
+    index = RepoIndex() if index is None else index
+    previous = load_inventory(org) if incremental else {}
+    if incremental:
+        print(f"🔁 {org}: incremental mode, {len(previous)} repos in previous snapshot")
+
+    # A full run starts the org-wide lookups alongside the listing; an
+    # incremental run only falls back to them when many repos changed
+    bulk_task = None if incremental else asyncio.create_task(load_bulk_lookups(client, org, index, journal))
+
+    def repo_key(repo):
+        return repo.full_name.lower()
+
+    # Reuse the previous result for every repo whose timestamps are unchanged
+    inventory = {}
+    changed = []
+    total_repos = 0
+    try:
+        with stage("listing"):
+            async for batch in iter_github_repos(client, org, journal):
+                total_repos += len(batch)
+                index.add_repos(batch)
+                for repo in batch:
+                    entry = previous.get(repo_key(repo))
+                    if entry and entry["pushed_at"] == repo.pushed_at and entry["updated_at"] == repo.updated_at:
+                        inventory[repo_key(repo)] = entry
+                    else:
+                        changed.append(repo)
+    except BaseException:
+        # Don't leave the org-wide lookups running (or failing unobserved)
+        # once the listing has failed; other orgs keep sharing the client
+        if bulk_task is not None:
+            bulk_task.cancel()
+        raise
+    print(f"🔎 {org}: total GitHub repos found: {total_repos}")
+
+    if bulk_task is None and len(changed) > INCREMENTAL_BULK_THRESHOLD:
+        bulk_task = asyncio.create_task(load_bulk_lookups(client, org, index, journal))
+
+    if bulk_task is not None:
+        await bulk_task
+        rows = [
+            build_row(repo, custom_props, is_codacy_integrated(codacy_item))
+            for repo, custom_props, codacy_item in index.join(changed)
+        ]
+    else:
+        recorded = {entry["key"]: entry["row"] for entry in journal.entries("repo", org=org)} if journal is not None else {}
+
+        async def recheck(repo):
+            if repo_key(repo) in recorded:
+                return recorded[repo_key(repo)]
+            row = await recheck_repo(client, repo)
+            if journal is not None:
+                journal.record("repo", org=org, key=repo_key(repo), row=row)
+            return row
+
+        rows = await asyncio.gather(*(recheck(repo) for repo in changed))
 
+    for repo, row in zip(changed, rows):
+        inventory[repo_key(repo)] = inventory_entry(repo, row)
+    if incremental:
+        print(f"🔁 {org}: re-checked {len(changed)} new or modified repos, reused {total_repos - len(changed)}")
+    save_inventory(org, inventory)
+
+    soc_rows = inventory_rows(org, inventory)
     soc_rows.sort(key=lambda x: x[0].lower())
+    return soc_rows
+
+async def collect_orgs_soc_rows(client, orgs, incremental=False, index=None, journal=None):
+    """
+    Run collect_soc_rows for every org concurrently over one shared client,
+    so all orgs draw from the same rate limit budget and connection pool,
+    and the same RepoIndex when one is given.
+    An org that fails is reported and left out; the others still finish.
+    Returns (soc_rows, failed_orgs), with rows sorted by org, then name.
+    """
+    async def collect(org):
+        try:
+            rows = await collect_soc_rows(client, org, incremental=incremental, index=index, journal=journal)
+        except Exception as e:
+            print(f"❌ {org}: audit failed: {e}")
+            return org, None
+        print(f"✅ {org}: {len(rows)} SOC-compliant repos")
+        return org, rows
+
+    soc_rows = []
+    failed_orgs = []
+    for org, rows in await asyncio.gather(*(collect(org) for org in orgs)):
+        if rows is None:
+            failed_orgs.append(org)
+        else:
+            soc_rows.extend(rows)
+    soc_rows.sort(key=lambda x: (x[-1].lower(), x[0].lower()))
+    return soc_rows, failed_orgs
+
+async def audit_orgs(client, orgs, incremental=False, journal=None):
+    soc_rows, failed_orgs = await collect_orgs_soc_rows(client, orgs, incremental=incremental, journal=journal)
+    # A run missing an org would become the next diff's baseline and report
+    # every repo of that org as left_soc, so only complete runs are recorded
+    if failed_orgs:
+        print("⚠️ Snapshot not recorded: the audit is missing some orgs.")
+    else:
+        with SnapshotStore() as store:
+            store.append_soc_rows(run_timestamp(), ",".join(orgs), soc_rows)
 
     if not soc_rows:
         print("⚠️ No SOC-compliant repositories found.")
     else:
         export_to_csv(soc_rows)
 
+    if failed_orgs:
+        raise Exception(f"🚨 Audit failed for: {', '.join(failed_orgs)}")
+
+async def run(incremental=False, resume=False):
+    # The journal is kept if an org fails, so --resume only redoes the missing work
+    with Journal("generate_csv2", resume=resume) as journal:
+        async with HttpClient(cache=HttpCache()) as client:
+            await audit_orgs(client, GITHUB_ORGS, incremental=incremental, journal=journal)
+        journal.complete()
+    print(client.stats.summary())
+    print(client.cache.summary())
+
+def main():
+    parser = argparse.ArgumentParser(description="Export SOC-compliant repositories to CSV.")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="only re-check repos pushed or updated since the previous snapshot"
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="continue an interrupted run from its checkpoint journal, skipping finished pages and repos"
+    )
+    args = parser.parse_args()
+    with instrumented("generate_csv2"):
+        asyncio.run(run(incremental=args.incremental, resume=args.resume))
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import sqlite3
+
+# Configuration Section
+
+# SQLite file holding cached responses, kept outside reports/ so it is never committed
+HTTP_CACHE_PATH = os.getenv(
+    "HTTP_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache", "http_cache.sqlite")
+)
+
+# Entries not revalidated within this many seconds are dropped (default: 7 days)
+HTTP_CACHE_TTL = float(os.getenv("HTTP_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Least recently used entries are evicted once the cache grows past this size
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Writes between commits, so a run that is killed keeps most of what it cached
+HTTP_CACHE_COMMIT_EVERY = int(os.getenv("HTTP_CACHE_COMMIT_EVERY", "100"))
+
+# Response headers replayed on a cache hit (Link is needed for pagination)
+CACHED_HEADERS = ("Content-Type", "Link", "ETag", "Last-Modified")
+
+# --------------------- Response Cache ----------------------------------
+
+class CacheEntry:
+    """A cached response body with the validators needed to revalidate it."""
+
+    __slots__ = ("etag", "last_modified", "headers", "body")
+
+    def __init__(self, etag, last_modified, headers, body):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.headers = headers
+        self.body = body
+
+    def conditional_headers(self):
+        """Build If-None-Match/If-Modified-Since headers for a revalidation request."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class HttpCache:
+    """
+    On-disk cache of GET responses keyed by Accept header and URL.
+    Bodies are stored with their ETag/Last-Modified so later runs can send
+    conditional requests; a 304 reply is then served from disk.
+    """
+
+    def __init__(self, path=HTTP_CACHE_PATH, ttl=HTTP_CACHE_TTL, max_bytes=HTTP_CACHE_MAX_BYTES,
+                 commit_every=HTTP_CACHE_COMMIT_EVERY):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.commit_every = commit_every
+        self._uncommitted = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                used_at REAL NOT NULL
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS memo (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                used_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )"""
+        )
+        self._db.commit()
+
+    def _written(self):
+        """Count a write, committing every commit_every of them."""
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self._db.commit()
+            self._uncommitted = 0
+
+    @staticmethod
+    def make_key(url, headers=None):
+        accept = (headers or {}).get("Accept", "")
+        return f"{accept} {url}"
+
+    def lookup(self, key):
+        """Return the cached entry for a key, or None if missing or expired."""
+        row = self._db.execute(
+            "SELECT etag, last_modified, headers, body, used_at FROM responses WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, headers, body, used_at = row
+        if time.time() - used_at > self.ttl:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            return None
+        return CacheEntry(etag, last_modified, json.loads(headers), body)
+
+    def store(self, key, resp):
+        """Cache a 200 response if it carries a validator; otherwise skip it."""
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        headers = {name: resp.headers[name] for name in CACHED_HEADERS if name in resp.headers}
+        body = resp.content
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, etag, last_modified, json.dumps(headers), body, len(body), time.time())
+        )
+        self._written()
+
+    def record_hit(self, key, entry, resp):
+        """
+        Count a 304 reply to a revalidation and update the stored headers with
+        the ones it carries (RFC 7234 section 4.3.4), e.g. a Link header whose
+        last page moved while page 1 stayed the same. Returns the updated entry.
+        """
+        self.hits += 1
+        self.bytes_saved += len(entry.body)
+        entry.headers.update({name: resp.headers[name] for name in CACHED_HEADERS if name in resp.headers})
+        entry.etag = entry.headers.get("ETag", entry.etag)
+        entry.last_modified = entry.headers.get("Last-Modified", entry.last_modified)
+        self._db.execute(
+            "UPDATE responses SET etag = ?, last_modified = ?, headers = ?, used_at = ? WHERE key = ?",
+            (entry.etag, entry.last_modified, json.dumps(entry.headers), time.time(), key)
+        )
+        self._written()
+        return entry
+
+    def record_miss(self):
+        self.misses += 1
+
+    def memo_get(self, namespace, key):
+        """
+        Return a value memoized by memo_set, or None.
+        Used for small derived results that outlive the response they came from.
+        """
+        row = self._db.execute(
+            "SELECT value FROM memo WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        self._db.execute(
+            "UPDATE memo SET used_at = ? WHERE namespace = ? AND key = ?",
+            (time.time(), namespace, key)
+        )
+        return json.loads(row[0])
+
+    def memo_set(self, namespace, key, value):
+        self._db.execute(
+            "INSERT OR REPLACE INTO memo VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value), time.time())
+        )
+        self._written()
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under max_bytes."""
+        self._db.execute("DELETE FROM responses WHERE used_at < ?", (time.time() - self.ttl,))
+        self._db.execute("DELETE FROM memo WHERE used_at < ?", (time.time() - self.ttl,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            freed = 0
+            stale_keys = []
+            for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY used_at"):
+                if freed >= excess:
+                    break
+                stale_keys.append((key,))
+                freed += size
+            self._db.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+        self._db.commit()
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        hit_rate = (self.hits / lookups) * 100 if lookups else 0
+        return (
+            f"🗄️ HTTP cache hits: {self.hits}, misses: {self.misses} ({hit_rate:.1f}% hit rate), "
+            f"{self.bytes_saved / 1024:.0f} KiB served from cache"
+        )
+
+    def close(self):
+        self.evict()
+        self._db.close()
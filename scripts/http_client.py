@@ -0,0 +1,339 @@
+import os
+import time
+import random
+import asyncio
+import httpx
+import instrumentation
+from urllib.parse import urlparse, parse_qs
+
+# Configuration Section
+
+# Maximum number of requests in flight at once, shared by every caller
+HTTP_CONCURRENCY = int(os.getenv("HTTP_CONCURRENCY", "50"))
+
+# Lower bound the scheduler may shrink concurrency to when budget runs low
+HTTP_MIN_CONCURRENCY = int(os.getenv("HTTP_MIN_CONCURRENCY", "2"))
+
+# Per-request timeout in seconds
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+
+# Retry policy: attempts after the first one, and exponential backoff bounds in seconds
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "5"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "1"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "60"))
+
+# Start shrinking concurrency once less than this fraction of the rate limit is left
+RATE_LIMIT_LOW_WATERMARK = 0.1
+
+# Status codes that are always worth retrying
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Helper Functions
+
+def http2_available():
+    """
+    Checks whether the optional 'h2' package is installed.
+    Returns True if HTTP/2 can be negotiated, otherwise False.
+    """
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter for the given retry attempt."""
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** attempt))
+
+def _header_float(resp, name):
+    try:
+        return float(resp.headers[name])
+    except (KeyError, ValueError):
+        return None
+
+def is_throttled(resp):
+    """
+    Checks if a response is a primary or secondary rate limit rejection.
+    GitHub signals both with 403 or 429, plus rate limit headers or Retry-After.
+    """
+    if resp.status_code == 429:
+        return True
+    if resp.status_code != 403:
+        return False
+    if resp.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in resp.headers:
+        return True
+    return "rate limit" in resp.text.lower()
+
+def throttle_delay(resp, attempt):
+    """
+    Work out how long to wait before retrying a throttled response.
+    Prefers Retry-After, then X-RateLimit-Reset, then jittered backoff.
+    """
+    retry_after = _header_float(resp, "Retry-After")
+    if retry_after is not None:
+        return retry_after
+    reset = _header_float(resp, "X-RateLimit-Reset")
+    if resp.headers.get("X-RateLimit-Remaining") == "0" and reset is not None:
+        return max(0.0, reset - time.time()) + 1
+    return backoff_delay(attempt)
+
+def last_page(resp):
+    """
+    Read the page number of rel="last" from a response's Link header.
+    Returns 1 if there is no Link header, i.e. the listing fits on one page.
+    """
+    last_url = resp.links.get("last", {}).get("url")
+    if not last_url:
+        return 1
+    return int(parse_qs(urlparse(last_url).query).get("page", ["1"])[0])
+
+async def iter_pages(client, url, **kwargs):
+    """
+    Yield each page of a Link-paginated listing (such as the GitHub REST API)
+    as soon as it arrives. Page 1 is fetched first to learn the last page,
+    then every remaining page is requested concurrently, so pages after the
+    first are yielded in completion order rather than page order.
+    """
+    async for _, _, data in iter_numbered_pages(client, url, **kwargs):
+        yield data
+
+async def iter_numbered_pages(client, url, skip=(), last=None, **kwargs):
+    """
+    iter_pages yielding (page, last_page, data), for callers that checkpoint
+    pages. Pages in `skip` are not fetched; page 1 is only fetched if it is
+    not skipped or `last` (the last page, from a checkpoint) is unknown.
+    """
+    separator = "&" if "?" in url else "?"
+
+    async def fetch_page(page):
+        resp = await client.get(f"{url}{separator}page={page}", **kwargs)
+        if resp.status_code != 200:
+            raise Exception(f"🚨 Failed to fetch {url} (status {resp.status_code}): {resp.text}")
+        return page, resp
+
+    first = None
+    if 1 not in skip or last is None:
+        _, first = await fetch_page(1)
+        last = last_page(first)
+    # Start the fan-out before handing page 1 to the caller, so the rest of
+    # the listing downloads while the first page is being processed
+    pending = [asyncio.ensure_future(fetch_page(page)) for page in range(2, last + 1) if page not in skip]
+    try:
+        if first is not None and 1 not in skip:
+            yield 1, last, first.json()
+        for next_page in asyncio.as_completed(pending):
+            page, resp = await next_page
+            yield page, last, resp.json()
+    finally:
+        for task in pending:
+            task.cancel()
+
+# --------------------- Scheduling ----------------------------------
+
+class RequestStats:
+    """Counters collected by the scheduler over the lifetime of a client."""
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+
+    def summary(self):
+        return (
+            f"📊 HTTP requests: {self.requests}, retries: {self.retries}, "
+            f"throttled responses: {self.throttled}, "
+            f"time throttled: {self.throttled_seconds:.1f}s"
+        )
+
+class AdaptiveLimiter:
+    """
+    Concurrency limiter whose limit can be resized while requests are in flight.
+    Grows by one slot per window of successful requests and halves on throttling,
+    once per throttle window: entering the limiter returns the current epoch,
+    and only a request sent after the last decrease can trigger the next one.
+    """
+
+    def __init__(self, limit, minimum=HTTP_MIN_CONCURRENCY):
+        self.maximum = limit
+        self.minimum = min(minimum, limit)
+        self.limit = limit
+        self._in_flight = 0
+        self._successes = 0
+        self._epoch = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+            return self._epoch
+
+    async def __aexit__(self, *exc_info):
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    async def resize(self, limit):
+        async with self._condition:
+            self.limit = max(self.minimum, min(self.maximum, limit))
+            self._condition.notify_all()
+
+    async def on_success(self, remaining=None, rate_limit=None):
+        """Additive increase, unless the remaining budget is running low."""
+        if remaining is not None and rate_limit:
+            if remaining < rate_limit * RATE_LIMIT_LOW_WATERMARK:
+                await self.resize(min(self.limit, int(remaining) // 10))
+                return
+        self._successes += 1
+        if self._successes >= self.limit:
+            self._successes = 0
+            await self.resize(self.limit + 1)
+
+    async def on_throttle(self, epoch):
+        """
+        Multiplicative decrease after a rate limit rejection. Rejections of
+        requests sent before the last decrease belong to the burst it already
+        answered, so they leave the limit alone.
+        """
+        self._successes = 0
+        if epoch != self._epoch:
+            return
+        self._epoch += 1
+        await self.resize(self.limit // 2)
+
+# --------------------- HTTP Client ----------------------------------
+
+class HttpClient:
+    """
+    Shared async HTTP client for all GitHub and Codacy calls.
+    Connections are kept alive and reused across requests, HTTP/2 is used
+    when available, and requests go through a rate-limit-aware scheduler:
+    throttled and failed requests are retried with backoff, the whole client
+    pauses until the limit resets, and concurrency adapts to the remaining budget.
+    When an HttpCache is given, GET requests are sent as conditional requests
+    and 304 replies are answered from the cache.
+    """
+
+    def __init__(self, concurrency=HTTP_CONCURRENCY, timeout=HTTP_TIMEOUT,
+                 max_retries=HTTP_MAX_RETRIES, cache=None):
+        self.max_retries = max_retries
+        self.cache = cache
+        self.stats = RequestStats()
+        self._limiter = AdaptiveLimiter(concurrency)
+        self._resume_at = 0.0
+        self._client = httpx.AsyncClient(
+            http2=http2_available(),
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=concurrency,
+                max_keepalive_connections=concurrency
+            )
+        )
+
+    @property
+    def concurrency(self):
+        return self._limiter.limit
+
+    async def _wait_for_resume(self):
+        delay = self._resume_at - time.monotonic()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self._resume_at - time.monotonic()
+
+    def _pause(self, delay):
+        """Hold back every new request for `delay` seconds."""
+        now = time.monotonic()
+        resume_at = now + delay
+        if resume_at > self._resume_at:
+            self.stats.throttled_seconds += resume_at - max(now, self._resume_at)
+            self._resume_at = resume_at
+
+    async def request(self, method, url, stream=False, **kwargs):
+        """
+        Send a request through the scheduler.
+        Returns the final response; it is only non-2xx once retries are used up
+        or the status is not retryable. With stream=True the body of a
+        successful response is left unread and the caller must close it.
+        """
+        attempt = 0
+        while True:
+            await self._wait_for_resume()
+            try:
+                async with self._limiter as epoch:
+                    self.stats.requests += 1
+                    request = self._client.build_request(method, url, **kwargs)
+                    started = time.perf_counter()
+                    resp = await self._client.send(request, stream=stream)
+                    if stream and resp.status_code >= 400:
+                        # Error bodies are small and needed to spot secondary rate limits
+                        await resp.aread()
+                    # Streamed bodies are not read yet, so only their headers count here
+                    instrumentation.profile.record_request(
+                        time.perf_counter() - started, resp.num_bytes_downloaded
+                    )
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.stats.retries += 1
+                instrumentation.profile.record_retry()
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+
+            if is_throttled(resp):
+                self.stats.throttled += 1
+                await self._limiter.on_throttle(epoch)
+                if attempt >= self.max_retries:
+                    return resp
+                self._pause(throttle_delay(resp, attempt))
+            elif resp.status_code in RETRY_STATUSES:
+                if attempt >= self.max_retries:
+                    return resp
+                await asyncio.sleep(backoff_delay(attempt))
+            else:
+                remaining = _header_float(resp, "X-RateLimit-Remaining")
+                reset = _header_float(resp, "X-RateLimit-Reset")
+                if remaining == 0 and reset is not None:
+                    # Budget is spent: hold everyone back instead of collecting 403s
+                    self._pause(max(0.0, reset - time.time()) + 1)
+                await self._limiter.on_success(
+                    remaining, _header_float(resp, "X-RateLimit-Limit")
+                )
+                return resp
+            attempt += 1
+            self.stats.retries += 1
+            instrumentation.profile.record_retry()
+
+    async def get(self, url, headers=None, stream=False, **kwargs):
+        if self.cache is None or stream:
+            return await self.request("GET", url, headers=headers, stream=stream, **kwargs)
+
+        key = self.cache.make_key(url, headers)
+        entry = self.cache.lookup(key)
+        if entry is not None:
+            headers = {**(headers or {}), **entry.conditional_headers()}
+        resp = await self.request("GET", url, headers=headers, **kwargs)
+
+        if resp.status_code == 304 and entry is not None:
+            entry = self.cache.record_hit(key, entry, resp)
+            instrumentation.profile.record_cache_hit()
+            return httpx.Response(200, headers=entry.headers, content=entry.body, request=resp.request)
+        self.cache.record_miss()
+        if resp.status_code == 200:
+            self.cache.store(key, resp)
+        return resp
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        await self._client.aclose()
+        if self.cache is not None:
+            self.cache.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import functools
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+
+# Configuration Section
+
+# Run profiles (and profiler output) go to an ignored directory outside reports/,
+# so the report workflows never commit them; CI uploads them as an artifact instead
+RUN_PROFILE_DIR = os.getenv(
+    "RUN_PROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "run_profiles")
+)
+
+# Optional function-level profiler around the whole run: "cprofile" or "pyinstrument"
+RUN_PROFILER = os.getenv("RUN_PROFILER", "").strip().lower()
+
+# Name of the stage the running code (and every task it starts) belongs to;
+# asyncio tasks copy it when created, so requests are attributed correctly
+# even when stages overlap
+_current_stage = contextvars.ContextVar("stage", default="other")
+
+# Helper Functions
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list, or None if it is empty."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+# --------------------- Run Profile ----------------------------------
+
+class StageStats:
+    """Timing and HTTP counters collected for one named stage."""
+
+    def __init__(self):
+        self.calls = 0
+        self.busy_seconds = 0.0
+        self.first_start = None
+        self.last_end = None
+        self.requests = 0
+        self.bytes = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.latencies = []
+
+    def as_dict(self):
+        latencies = sorted(self.latencies)
+        wall = (self.last_end - self.first_start) if self.first_start is not None else 0.0
+        return {
+            "calls": self.calls,
+            # Overlapping calls (e.g. one README check per repo) are counted
+            # once in wall_seconds and individually in busy_seconds
+            "wall_seconds": round(wall, 3),
+            "busy_seconds": round(self.busy_seconds, 3),
+            "requests": self.requests,
+            "bytes": self.bytes,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "latency_p50_ms": None if not latencies else round(percentile(latencies, 0.5) * 1000, 1),
+            "latency_p95_ms": None if not latencies else round(percentile(latencies, 0.95) * 1000, 1),
+        }
+
+class RunProfile:
+    """
+    Per-stage wall time and HTTP counters for one run of a script.
+    HttpClient reports every request attempt here; scripts mark their
+    stages with stage() or timed().
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.stages = {}
+
+    def _stats(self, name=None):
+        name = name or _current_stage.get()
+        if name not in self.stages:
+            self.stages[name] = StageStats()
+        return self.stages[name]
+
+    def record_stage(self, name, start, end):
+        stats = self._stats(name)
+        stats.calls += 1
+        stats.busy_seconds += end - start
+        stats.first_start = start if stats.first_start is None else min(stats.first_start, start)
+        stats.last_end = end if stats.last_end is None else max(stats.last_end, end)
+
+    def record_request(self, latency, nbytes):
+        stats = self._stats()
+        stats.requests += 1
+        stats.bytes += nbytes
+        stats.latencies.append(latency)
+
+    def record_retry(self):
+        self._stats().retries += 1
+
+    def record_cache_hit(self):
+        self._stats().cache_hits += 1
+
+    def as_dict(self, name):
+        return {
+            "script": name,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "total_seconds": round(time.perf_counter() - self._start, 3),
+            "stages": {stage: stats.as_dict() for stage, stats in self.stages.items()},
+        }
+
+    def summary(self):
+        lines = ["⏱️ Run profile:"]
+        for stage, stats in self.stages.items():
+            data = stats.as_dict()
+            line = f"   {stage}: {data['wall_seconds']:.2f}s"
+            if data["requests"]:
+                line += (
+                    f", {data['requests']} requests, {data['bytes'] / 1024:.0f} KiB, "
+                    f"{data['retries']} retries, {data['cache_hits']} cache hits, "
+                    f"p50 {data['latency_p50_ms']}ms, p95 {data['latency_p95_ms']}ms"
+                )
+            lines.append(line)
+        return "\n".join(lines)
+
+    def write(self, name, profile_dir=RUN_PROFILE_DIR):
+        os.makedirs(profile_dir, exist_ok=True)
+        timestamp = self.started_at.strftime("%Y-%m-%d_%H-%M-%S")
+        path = os.path.join(profile_dir, f"run_profile_{name}_{timestamp}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(name), f, indent=2)
+        return path
+
+# The profile of the current process; every script run is one process
+profile = RunProfile()
+
+@contextmanager
+def stage(name):
+    """Time a block as stage `name`; requests made inside it are counted against it."""
+    token = _current_stage.set(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.record_stage(name, start, time.perf_counter())
+        _current_stage.reset(token)
+
+async def timed(name, awaitable):
+    """Await something as stage `name`, e.g. one coroutine inside asyncio.gather."""
+    with stage(name):
+        return await awaitable
+
+def staged(name):
+    """Decorator running every call of an async function as stage `name`."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with stage(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# --------------------- Profiler Hook ----------------------------------
+
+@contextmanager
+def profiler(name, profile_dir=RUN_PROFILE_DIR):
+    """
+    Run a block under cProfile or pyinstrument when RUN_PROFILER asks for it.
+    cProfile writes a .prof file (open with snakeviz or pstats); pyinstrument,
+    which is optional and imported only when selected, writes an HTML report.
+    """
+    if RUN_PROFILER not in ("cprofile", "pyinstrument"):
+        yield
+        return
+
+    os.makedirs(profile_dir, exist_ok=True)
+    timestamp = profile.started_at.strftime("%Y-%m-%d_%H-%M-%S")
+    path = os.path.join(profile_dir, f"run_profile_{name}_{timestamp}")
+    if RUN_PROFILER == "cprofile":
+        import cProfile
+
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            prof.dump_stats(f"{path}.prof")
+            print(f"🔬 cProfile output saved: {path}.prof")
+    else:
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise Exception("🚨 RUN_PROFILER=pyinstrument needs the 'pyinstrument' package installed")
+
+        prof = Profiler(async_mode="enabled")
+        prof.start()
+        try:
+            yield
+        finally:
+            prof.stop()
+            with open(f"{path}.html", "w", encoding="utf-8") as f:
+                f.write(prof.output_html())
+            print(f"🔬 pyinstrument output saved: {path}.html")
+
+@contextmanager
+def instrumented(name):
+    """
+    Wrap a script's whole run: optional profiler, then the run profile is
+    printed and written as JSON, also when the run fails.
+    """
+    try:
+        with profiler(name):
+            yield profile
+    finally:
+        print(profile.summary())
+        print(f"⏱️ Run profile saved: {profile.write(name)}")
@@ -0,0 +1,113 @@
+import asyncio
+import argparse
+import codacy_csv
+import final_reports
+import generate_csv2
+from http_client import HttpClient
+from http_cache import HttpCache
+from snapshot_store import SnapshotStore, run_timestamp
+from repo_index import RepoIndex, repo_key
+from checkpoint import Journal
+from instrumentation import instrumented, stage
+
+# Single-process audit: SOC discovery -> Codacy enrichment -> charts/Excel.
+# Stages hand records to each other in memory; CSV files are an optional sink.
+
+# --------------------- Pipeline Stages ----------------------------------
+
+async def collect_records(store, run_ts, incremental=False, write_csv=False, journal=None):
+    """
+    Discover SOC-compliant repositories and join them with their Codacy
+    analysis over one shared HTTP client. Both stages fill one RepoIndex, so
+    each Codacy org is searched once per run and the Codacy rows come from
+    index lookups. Once both stages finished, both are appended to the
+    snapshot store under the same run timestamp, unless an org failed in
+    either: a run missing an org (or its Codacy half) would become the next
+    diff's baseline, so nothing is recorded for it.
+    With a journal, listing and search pages are checkpointed (see
+    checkpoint.Journal) and an interrupted run's pages are reused.
+    Orgs that fail are skipped so the rest of the report is still produced.
+    Returns (records, failed_orgs); records are dicts keyed by the report's
+    column names.
+    """
+    index = RepoIndex()
+    async with HttpClient(cache=HttpCache()) as client:
+        with stage("soc_discovery"):
+            soc_rows, failed_orgs = await generate_csv2.collect_orgs_soc_rows(
+                client, generate_csv2.GITHUB_ORGS, incremental=incremental, index=index, journal=journal
+            )
+        print(f"🔎 SOC-compliant repos found: {len(soc_rows)}")
+        if write_csv and soc_rows:
+            generate_csv2.export_to_csv(soc_rows)
+
+        # soc_rows columns: name, repo url, default branch, codacy integration, custom properties, org
+        soc_keys = [repo_key(row[1]) for row in soc_rows if row[1]]
+        with stage("codacy_report"):
+            # Discovery already searched its orgs unless it re-checked repos one by one (--incremental)
+            await codacy_csv.index_codacy_orgs(client, index, failed_orgs=failed_orgs, journal=journal)
+            codacy_rows = [row async for row in codacy_csv.iter_indexed_rows(client, index, soc_keys)]
+    print(client.stats.summary())
+    print(client.cache.summary())
+
+    if write_csv and codacy_rows:
+        codacy_csv.export_to_csv(codacy_rows, codacy_csv.report_path())
+    records = [dict(zip(codacy_csv.HEADER, row)) for row in codacy_rows]
+    if failed_orgs:
+        print("⚠️ Snapshot not recorded: the audit is missing some orgs.")
+    else:
+        store.append_soc_rows(run_ts, ",".join(generate_csv2.GITHUB_ORGS), soc_rows)
+        store.append_records(run_ts, "codacy", records, org=",".join(codacy_csv.ORG_NAMES))
+    return records, failed_orgs
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the SOC Codacy audit end to end in one process.")
+    parser.add_argument(
+        "--csv", action="store_true",
+        help="also write the intermediate SOC and Codacy CSV reports to reports/"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="only re-check repos pushed or updated since the previous snapshot"
+    )
+    parser.add_argument(
+        "--delta", action="store_true",
+        help="render the change report, and the full report only if something changed"
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="continue an interrupted run from its checkpoint journal, skipping finished pages and repos"
+    )
+    args = parser.parse_args()
+
+    with instrumented("pipeline"):
+        with SnapshotStore() as store, Journal("pipeline", resume=args.resume) as journal:
+            run_ts = run_timestamp()
+            records, failed_orgs = asyncio.run(collect_records(
+                store, run_ts, incremental=args.incremental, write_csv=args.csv, journal=journal
+            ))
+            if not records:
+                print("⚠️ No SOC-compliant Codacy repositories found.")
+            else:
+                coverage_benchmark, issue_benchmark = final_reports.load_config(final_reports.CONFIG_FILE)
+                chart_config = final_reports.load_chart_config(final_reports.CONFIG_FILE)
+                frame = final_reports.frame_from_records(records)
+                if failed_orgs:
+                    # No snapshot was recorded for this run, so there is nothing to diff
+                    final_reports.render_reports(
+                        frame, coverage_benchmark, issue_benchmark, chart_config, store, "soc"
+                    )
+                else:
+                    # Both stages share run_ts, so the "soc" rows also carry the Codacy fields
+                    final_reports.render_run(
+                        frame, store, run_ts, "soc", coverage_benchmark, issue_benchmark,
+                        chart_config, delta=args.delta
+                    )
+            # Keep the journal while an org is failing, so --resume only redoes that org
+            if not failed_orgs:
+                journal.complete()
+
+        if failed_orgs:
+            raise Exception(f"🚨 Audit failed for: {', '.join(dict.fromkeys(failed_orgs))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import re
+
+# Prefixes stripped when normalizing a repo reference to owner/name
+GITHUB_URL_PREFIX = re.compile(r"^(?:https?://)?(?:www\.)?github\.com/", re.IGNORECASE)
+
+# Codacy repositories that count as integrated: added to Codacy and followed
+CODACY_INTEGRATED_STATES = ("Following",)
+
+# Helper Functions
+
+def repo_key(value):
+    """
+    Normalize a repo reference (GitHub URL, "owner/name", with or without a
+    trailing slash or .git) to the lowercase owner/name every source is joined on.
+    """
+    key = GITHUB_URL_PREFIX.sub("", (value or "").strip()).strip("/")
+    if key.endswith(".git"):
+        key = key[:-4]
+    return key.lower()
+
+def codacy_item_key(item):
+    repo_info = item.get("repository", {})
+    return repo_key(f"{repo_info.get('owner', '')}/{repo_info.get('name', '')}")
+
+def codacy_item_id(item):
+    """GitHub repo id Codacy recorded for a search result (remoteIdentifier), or None."""
+    remote_id = item.get("repository", {}).get("remoteIdentifier")
+    return str(remote_id) if remote_id not in (None, "") else None
+
+def is_codacy_integrated(item):
+    return item is not None and item.get("repository", {}).get("addedState") in CODACY_INTEGRATED_STATES
+
+# --------------------- Repo Identity Index ----------------------------------
+
+class RepoIndex:
+    """
+    Every source of the audit keyed by repo identity: GitHub listing records,
+    org custom properties and Codacy search results. Each fetcher adds to it
+    as its pages arrive, in any order, and join() then matches them in one
+    pass of dict lookups.
+    Codacy results are also keyed by the GitHub repo id Codacy recorded, so a
+    repo renamed on GitHub still finds its Codacy analysis.
+    """
+
+    def __init__(self):
+        self.repos = {}
+        self.properties = {}
+        self.codacy_by_key = {}
+        self.codacy_by_id = {}
+        self.codacy_orgs = set()
+
+    def add_repos(self, records):
+        for record in records:
+            self.repos[repo_key(record.full_name)] = record
+
+    def add_properties(self, properties_by_name):
+        """Add org custom properties, as returned by get_org_custom_properties."""
+        for full_name, properties in properties_by_name.items():
+            self.properties[repo_key(full_name)] = properties
+
+    def add_codacy_items(self, items):
+        for item in items:
+            self.codacy_by_key[codacy_item_key(item)] = item
+            remote_id = codacy_item_id(item)
+            if remote_id is not None:
+                self.codacy_by_id[remote_id] = item
+
+    def codacy_item(self, repo):
+        """The Codacy search result of a GitHub RepoRecord: by repo id first, then by name."""
+        if repo.id is not None:
+            item = self.codacy_by_id.get(str(repo.id))
+            if item is not None:
+                return item
+        return self.codacy_by_key.get(repo_key(repo.full_name))
+
+    def join(self, repos=None):
+        """
+        Yield (repo, custom_properties, codacy_item) for every GitHub repo in
+        the index (or just `repos`); either side is None when a source has
+        no entry for the repo.
+        """
+        for repo in self.repos.values() if repos is None else repos:
+            yield repo, self.properties.get(repo_key(repo.full_name)), self.codacy_item(repo)
+
+    def codacy_items(self, keys):
+        """Yield the Codacy search result of each repo key that has one, in the given order."""
+        for key in keys:
+            repo = self.repos.get(key)
+            item = self.codacy_item(repo) if repo is not None else self.codacy_by_key.get(key)
+            if item is not None:
+                yield item
@@ -0,0 +1,31 @@
+from collections import namedtuple
+
+# Compact per-repository record kept instead of the full GitHub repo JSON.
+# A listing entry is ~6 KB of nested dicts (owner, permissions, license...);
+# only these fields are read downstream, so each page is projected down to
+# them as soon as it is parsed. readme_badge is "yes"/"no" when the listing
+# already told us (GraphQL reads READMEs inline), otherwise None.
+RepoRecord = namedtuple(
+    "RepoRecord",
+    ["name", "owner", "full_name", "html_url", "default_branch", "pushed_at", "updated_at", "id", "readme_badge"],
+    defaults=(None,)
+)
+
+def repo_record(item, org):
+    """Project one REST listing entry onto a RepoRecord; owner defaults to the org being listed."""
+    name = item.get("name", "")
+    owner = (item.get("owner") or {}).get("login") or org
+    return RepoRecord(
+        name=name,
+        owner=owner,
+        full_name=f"{owner}/{name}",
+        html_url=item.get("html_url", ""),
+        default_branch=item.get("default_branch", ""),
+        pushed_at=item.get("pushed_at"),
+        updated_at=item.get("updated_at"),
+        id=item.get("id"),
+    )
+
+def repo_records(batch, org):
+    """Project a page of REST listing entries."""
+    return [repo_record(item, org) for item in batch]
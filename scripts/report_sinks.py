@@ -0,0 +1,164 @@
+import os
+import json
+from datetime import datetime, timezone
+from snapshot_store import RUN_TS_FORMAT, run_timestamp
+
+# Typed copies of the CSV reports for downstream consumers. The CSVs stay the
+# primary output; each sink listed in REPORT_FORMATS is written next to it with
+# the same name, and the declared schema below instead of everything-as-text.
+# Parquet and Arrow IPC need the optional 'pyarrow' package; NDJSON does not.
+
+# Configuration Section
+
+# Extra sinks written next to every CSV report, comma-separated: parquet, arrow, ndjson
+REPORT_FORMATS = [fmt.strip().lower() for fmt in os.getenv("REPORT_FORMATS", "").split(",") if fmt.strip()]
+
+SINK_EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow", "ndjson": ".ndjson"}
+
+# Column holding the run timestamp (UTC) in every sink
+RUN_TS_COLUMN = "run_ts"
+
+# Declared column types by CSV column name; columns not listed are strings
+# and blank cells become nulls. "category" is dictionary encoded.
+SOC_SCHEMA = {
+    "S no.": "int",
+    "name": "string",
+    "repo url": "string",
+    "default branch": "string",
+    "codacy integration": "bool",
+    "custom properties": "category",
+    "org": "category",
+}
+
+CODACY_SCHEMA = {
+    "S no.": "int",
+    "name": "string",
+    "repo link": "string",
+    "compliance": "category",
+    "codacy integrated": "bool",
+    "grade": "category",
+    "coverage percentage": "float",
+    "org": "category",
+    "issue percentage": "float",
+    "complexity percentage": "float",
+    "duplication percentage": "float",
+}
+
+# Helper Functions
+
+def typed_value(kind, value):
+    if value is None or value == "":
+        return None
+    if kind == "int":
+        return int(float(value))
+    if kind == "float":
+        return float(value)
+    if kind == "bool":
+        return value if isinstance(value, bool) else str(value).strip().lower() in ("yes", "true", "1")
+    return str(value)
+
+def typed_columns(header, rows, schema):
+    """Turn CSV rows (lists in header order) into {column: [typed values]}."""
+    kinds = [schema.get(column, "string") for column in header]
+    columns = {column: [] for column in header}
+    for row in rows:
+        for column, kind, value in zip(header, kinds, row):
+            columns[column].append(typed_value(kind, value))
+    return columns
+
+def run_datetime(run_ts):
+    return datetime.strptime(run_ts, RUN_TS_FORMAT).replace(tzinfo=timezone.utc)
+
+def import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise Exception("🚨 Parquet and Arrow report sinks need the 'pyarrow' package installed")
+    return pyarrow
+
+def arrow_table(columns, schema, run_ts):
+    """Build a pyarrow Table with the declared types plus the run timestamp column."""
+    pa = import_pyarrow()
+
+    types = {
+        "int": pa.int32(),
+        "float": pa.float64(),
+        "bool": pa.bool_(),
+        "category": pa.dictionary(pa.int32(), pa.string()),
+        "string": pa.string(),
+    }
+    arrays = []
+    fields = []
+    for column, values in columns.items():
+        kind = schema.get(column, "string")
+        if kind == "category":
+            array = pa.array(values, type=pa.string()).dictionary_encode()
+        else:
+            array = pa.array(values, type=types[kind])
+        arrays.append(array)
+        fields.append(pa.field(column, types[kind]))
+    row_count = len(arrays[0]) if arrays else 0
+    arrays.append(pa.array([run_datetime(run_ts)] * row_count, type=pa.timestamp("s", tz="UTC")))
+    fields.append(pa.field(RUN_TS_COLUMN, pa.timestamp("s", tz="UTC")))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+def write_ndjson(path, columns, run_ts):
+    names = list(columns)
+    with open(path, "w", encoding="utf-8") as f:
+        for values in zip(*columns.values()):
+            record = dict(zip(names, values))
+            record[RUN_TS_COLUMN] = run_ts
+            f.write(json.dumps(record) + "\n")
+
+# --------------------- Sinks ----------------------------------
+
+def write_sinks(csv_path, header, rows, schema, run_ts=None, formats=None):
+    """
+    Write the rows of a CSV report to every sink in `formats` (default:
+    REPORT_FORMATS), as <csv name>.parquet / .arrow / .ndjson.
+    Returns the paths written.
+    """
+    formats = REPORT_FORMATS if formats is None else formats
+    unknown = [fmt for fmt in formats if fmt not in SINK_EXTENSIONS]
+    if unknown:
+        raise Exception(f"🚨 Unknown report formats: {', '.join(unknown)} (expected {', '.join(SINK_EXTENSIONS)})")
+    if not formats:
+        return []
+
+    run_ts = run_ts or run_timestamp()
+    columns = typed_columns(header, rows, schema)
+    base = os.path.splitext(csv_path)[0]
+    table = None
+    paths = []
+    for fmt in formats:
+        path = base + SINK_EXTENSIONS[fmt]
+        if fmt == "ndjson":
+            write_ndjson(path, columns, run_ts)
+        else:
+            table = table if table is not None else arrow_table(columns, schema, run_ts)
+            if fmt == "parquet":
+                import pyarrow.parquet as pq
+
+                pq.write_table(table, path, compression="zstd")
+            else:
+                import pyarrow as pa
+
+                with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        print(f"✅ {fmt} saved: {path}")
+        paths.append(path)
+    return paths
+
+def read_arrow_table(path):
+    """
+    Read a Parquet or Arrow IPC sink through a memory map, so column buffers
+    are used in place instead of being copied into the process.
+    """
+    pa = import_pyarrow()
+
+    if os.path.splitext(path)[1].lower() == SINK_EXTENSIONS["parquet"]:
+        import pyarrow.parquet as pq
+
+        return pq.read_table(path, memory_map=True)
+    # The table's buffers keep the map open for as long as they are in use
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
@@ -0,0 +1,352 @@
+import os
+import re
+import csv
+import glob
+import math
+import sqlite3
+import argparse
+from datetime import datetime, timedelta, timezone
+from repo_index import repo_key
+
+# Configuration Section
+
+# SQLite file holding one row per (run, repo), next to the CSV reports. The
+# workflows keep it in the Actions cache instead of committing it and upload
+# it as the snapshot-store artifact (kept 90 days) after every run, restoring
+# from that artifact when the cache was evicted. If both are gone the history
+# starts over; --import-reports rebuilds the SOC and Codacy runs from the
+# timestamped CSV reports committed under reports/
+SNAPSHOT_DB_PATH = os.getenv(
+    "SNAPSHOT_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "reports", "snapshots.sqlite")
+)
+
+REPORTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "reports")
+
+# Run timestamps are stored as UTC ISO strings so they sort chronologically
+RUN_TS_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# Report column -> snapshot column for each metric the query helpers accept
+METRIC_COLUMNS = {
+    "coverage percentage": "coverage",
+    "issue percentage": "issue",
+}
+
+# Repo fields filled in by each stage; a stage only overwrites its own fields
+SNAPSHOT_FIELDS = (
+    "name", "html_url", "default_branch", "soc", "codacy_integrated",
+    "compliance", "grade", "coverage", "issue"
+)
+
+# Restricts a snapshots query to the runs of one stage; bound to (stage, stage), NULL for every stage
+STAGE_FILTER = "(? IS NULL OR run_ts IN (SELECT run_ts FROM runs WHERE stage = ?))"
+
+# Helper Functions
+
+def run_timestamp(when=None):
+    """Format a datetime (default: now) as a run timestamp."""
+    return (when or datetime.now(timezone.utc)).strftime(RUN_TS_FORMAT)
+
+def since_timestamp(days):
+    """Run timestamp of `days` days ago, for the `since` argument of the query helpers."""
+    return run_timestamp(datetime.now(timezone.utc) - timedelta(days=days))
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(number) else number
+
+def _flag(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        return int(value)
+    return 1 if str(value).strip().lower() in ("yes", "true") else 0
+
+def _text(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return str(value)
+
+def soc_snapshot(row):
+    """Map a generate_csv2 row [name, html_url, default_branch, codacy yes/no, "SOC"] to snapshot fields."""
+    name, html_url, default_branch, codacy_integration = row[:4]
+    return {
+        "name": name,
+        "html_url": html_url,
+        "default_branch": default_branch,
+        "soc": 1,
+        "codacy_integrated": _flag(codacy_integration),
+    }
+
+def report_snapshot(record):
+    """Map a Codacy/final report record (dict keyed by column name) to snapshot fields."""
+    return {
+        "name": _text(record.get("name")),
+        "html_url": _text(record.get("repo link")),
+        "soc": 1,
+        "codacy_integrated": _flag(record.get("codacy integrated")),
+        "compliance": _text(record.get("compliance")),
+        "grade": _text(record.get("grade")),
+        "coverage": _number(record.get("coverage percentage")),
+        "issue": _number(record.get("issue percentage")),
+    }
+
+def report_snapshots(records):
+    """Map report records to (repo key, snapshot fields), skipping records without a repo link."""
+    snapshots = []
+    for record in records:
+        url = _text(record.get("repo link"))
+        if url:
+            snapshots.append((repo_key(url), report_snapshot(record)))
+    return snapshots
+
+def org_set(org):
+    """Normalize the org column of a run ("b,A" and "a,b" are the same audit; None is "")."""
+    return ",".join(sorted({name.strip().lower() for name in (org or "").split(",") if name.strip()}))
+
+def metric_column(metric):
+    column = METRIC_COLUMNS.get(metric, metric)
+    if column not in METRIC_COLUMNS.values():
+        raise Exception(f"🚨 Unknown snapshot metric: {metric}")
+    return column
+
+# --------------------- Snapshot Store ----------------------------------
+
+class SnapshotStore:
+    """
+    Append-only history of audit results, one row per (run timestamp, repo).
+    Each stage of a run (SOC discovery, Codacy report, final report) upserts
+    the fields it knows into the same rows, so a pipeline run ends up with
+    one complete row per repo while standalone scripts add partial ones.
+    """
+
+    def __init__(self, path=SNAPSHOT_DB_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS runs (
+                run_ts TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                org TEXT,
+                repos INTEGER NOT NULL,
+                PRIMARY KEY (run_ts, stage)
+            )"""
+        )
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS snapshots (
+                run_ts TEXT NOT NULL,
+                repo TEXT NOT NULL,
+                name TEXT,
+                html_url TEXT,
+                default_branch TEXT,
+                soc INTEGER,
+                codacy_integrated INTEGER,
+                compliance TEXT,
+                grade TEXT,
+                coverage REAL,
+                issue REAL,
+                PRIMARY KEY (run_ts, repo)
+            ) WITHOUT ROWID"""
+        )
+        # Per-repo time series read this index instead of scanning every run
+        self._db.execute("CREATE INDEX IF NOT EXISTS snapshots_repo ON snapshots (repo, run_ts)")
+        self._db.commit()
+
+    def _append(self, run_ts, stage, org, snapshots):
+        columns = ", ".join(SNAPSHOT_FIELDS)
+        placeholders = ", ".join("?" for _ in SNAPSHOT_FIELDS)
+        updates = ", ".join(f"{field} = COALESCE(excluded.{field}, {field})" for field in SNAPSHOT_FIELDS)
+        rows = [
+            (run_ts, key, *(fields.get(field) for field in SNAPSHOT_FIELDS))
+            for key, fields in snapshots
+        ]
+        self._db.executemany(
+            f"""INSERT INTO snapshots (run_ts, repo, {columns}) VALUES (?, ?, {placeholders})
+                ON CONFLICT (run_ts, repo) DO UPDATE SET {updates}""",
+            rows
+        )
+        self._db.execute(
+            "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?)", (run_ts, stage, org, len(rows))
+        )
+        self._db.commit()
+        return len(rows)
+
+    def append_soc_rows(self, run_ts, org, soc_rows):
+        """Record the SOC-compliant repos found by generate_csv2 for a run."""
+        snapshots = [(repo_key(row[1]), soc_snapshot(row)) for row in soc_rows if row[1]]
+        return self._append(run_ts, "soc", org, snapshots)
+
+    def append_records(self, run_ts, stage, records, org=None):
+        """Record Codacy or final report records (dicts keyed by the report's column names)."""
+        return self._append(run_ts, stage, org, report_snapshots(records))
+
+    def matching_run(self, stage, records):
+        """
+        Return the latest run of `stage` if it recorded exactly these report
+        records (same repos, same field values), else None.
+        """
+        latest = self.latest_runs(stage, count=1)
+        if not latest:
+            return None
+        current = {
+            key: {field: fields.get(field) for field in SNAPSHOT_FIELDS}
+            for key, fields in report_snapshots(records)
+        }
+        return latest[0] if current == self.run_rows(latest[0]) else None
+
+    # --------------------- Queries ----------------------------------
+
+    def runs(self, stage=None, since=None):
+        """Return the run timestamps recorded (for one stage, if given), oldest first."""
+        query = "SELECT DISTINCT run_ts FROM runs WHERE (? IS NULL OR stage = ?) AND run_ts >= ? ORDER BY run_ts"
+        return [row[0] for row in self._db.execute(query, (stage, stage, since or ""))]
+
+    def latest_runs(self, stage, before=None, count=2, orgs=None):
+        """
+        Return the most recent run timestamps of a stage (before `before`, if
+        given), newest first. With `orgs` (an org_set string), only runs that
+        audited exactly that set of orgs are returned.
+        """
+        query = "SELECT run_ts, org FROM runs WHERE stage = ? AND (? IS NULL OR run_ts < ?) ORDER BY run_ts DESC"
+        if orgs is None:
+            query += " LIMIT ?"
+            return [row[0] for row in self._db.execute(query, (stage, before, before, count))]
+        runs = []
+        for run_ts, org in self._db.execute(query, (stage, before, before)):
+            if org_set(org) == orgs:
+                runs.append(run_ts)
+                if len(runs) == count:
+                    break
+        return runs
+
+    def run_orgs(self, stage, run_ts):
+        """Return the org_set of one run of a stage, or None if the run is not recorded."""
+        row = self._db.execute("SELECT org FROM runs WHERE stage = ? AND run_ts = ?", (stage, run_ts)).fetchone()
+        return org_set(row[0]) if row else None
+
+    def run_rows(self, run_ts):
+        """Return {repo: fields} for one run, read through the primary key."""
+        columns = ", ".join(SNAPSHOT_FIELDS)
+        cursor = self._db.execute(f"SELECT repo, {columns} FROM snapshots WHERE run_ts = ?", (run_ts,))
+        return {row[0]: dict(zip(SNAPSHOT_FIELDS, row[1:])) for row in cursor}
+
+    def repo_series(self, repo, metric="coverage percentage", since=None):
+        """Return [(run_ts, value)] for one repo's metric, oldest first."""
+        column = metric_column(metric)
+        query = (
+            f"SELECT run_ts, {column} FROM snapshots "
+            f"WHERE repo = ? AND run_ts >= ? AND {column} IS NOT NULL ORDER BY run_ts"
+        )
+        return self._db.execute(query, (repo.lower(), since or "")).fetchall()
+
+    def org_series(self, metric="coverage percentage", benchmark=None, since=None, stage=None):
+        """
+        Aggregate a metric over every repo for each run (of one stage, if
+        given), oldest first.
+        Returns [(run_ts, repos, mean, minimum, maximum, below_benchmark)];
+        below_benchmark is None when no benchmark is given.
+        """
+        column = metric_column(metric)
+        query = (
+            f"SELECT run_ts, COUNT({column}), AVG({column}), MIN({column}), MAX({column}), "
+            f"SUM({column} < ?) FROM snapshots "
+            f"WHERE run_ts >= ? AND {column} IS NOT NULL AND {STAGE_FILTER} GROUP BY run_ts ORDER BY run_ts"
+        )
+        rows = self._db.execute(query, (benchmark, since or "", stage, stage)).fetchall()
+        if benchmark is None:
+            rows = [row[:5] + (None,) for row in rows]
+        return rows
+
+    def iter_history(self, since=None, stage=None):
+        """
+        Yield (repo, run_ts, grade, coverage, issue) rows for every repo with
+        a Codacy metric in the runs (of one stage, if given), grouped by repo.
+        Rows come straight off the cursor.
+        """
+        yield from self._db.execute(
+            "SELECT repo, run_ts, grade, coverage, issue FROM snapshots "
+            "WHERE run_ts >= ? AND (coverage IS NOT NULL OR issue IS NOT NULL OR grade IS NOT NULL) "
+            f"AND {STAGE_FILTER} ORDER BY repo, run_ts",
+            (since or "", stage, stage)
+        )
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# --------------------- Backfill ----------------------------------
+
+def report_file_timestamp(path):
+    """Read the run timestamp from a report named ..._YYYY-MM-DD_HH-MM-SS.csv, or None."""
+    match = re.search(r"_(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})\.csv$", path)
+    if not match:
+        return None
+    return run_timestamp(datetime.strptime(match.group(1), "%Y-%m-%d_%H-%M-%S"))
+
+def import_reports(store, reports_dir=REPORTS_DIR):
+    """
+    Load the timestamped CSV reports already committed under reports/ into
+    the store, so trend queries cover the runs made before it existed.
+    Returns the number of report files imported.
+    """
+    imported = 0
+    for path in sorted(glob.glob(os.path.join(reports_dir, "soc_compliant_repos2_*.csv"))):
+        run_ts = report_file_timestamp(path)
+        if run_ts:
+            with open(path, newline="", encoding="utf-8") as f:
+                rows = [
+                    [row.get("name", ""), row.get("repo url", ""), row.get("default branch", ""),
+                     row.get("codacy integration", ""), row.get("custom properties", "")]
+                    for row in csv.DictReader(f)
+                ]
+            store.append_soc_rows(run_ts, None, rows)
+            imported += 1
+    for path in sorted(glob.glob(os.path.join(reports_dir, "codacy_soc_compliant_report_*.csv"))):
+        run_ts = report_file_timestamp(path)
+        if run_ts:
+            with open(path, newline="", encoding="utf-8") as f:
+                store.append_records(run_ts, "codacy", csv.DictReader(f))
+            imported += 1
+    return imported
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or backfill the audit snapshot history.")
+    parser.add_argument(
+        "--import-reports", action="store_true",
+        help="load the timestamped CSV reports under reports/ into the store"
+    )
+    parser.add_argument("--repo", help="print the metric history of one owner/name")
+    parser.add_argument(
+        "--metric", default="coverage percentage", choices=sorted(METRIC_COLUMNS),
+        help="metric to report (default: coverage percentage)"
+    )
+    parser.add_argument("--days", type=int, default=90, help="how far back to look (default: 90)")
+    parser.add_argument(
+        "--stage", choices=["soc", "codacy", "report"],
+        help="only aggregate the runs of one stage (default: every run)"
+    )
+    args = parser.parse_args()
+
+    with SnapshotStore() as store:
+        if args.import_reports:
+            print(f"✅ Imported {import_reports(store)} report files into {store.path}")
+        since = since_timestamp(args.days)
+        if args.repo:
+            for run_ts, value in store.repo_series(args.repo, args.metric, since):
+                print(f"{run_ts}  {value:.2f}")
+        else:
+            series = store.org_series(args.metric, since=since, stage=args.stage)
+            for run_ts, repos, mean, low, high, _ in series:
+                print(f"{run_ts}  repos: {repos}  mean: {mean:.2f}  min: {low:.2f}  max: {high:.2f}")
+
+if __name__ == "__main__":
+    main()
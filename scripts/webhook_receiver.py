@@ -0,0 +1,363 @@
+import os
+import hmac
+import json
+import asyncio
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import generate_csv2
+from http_client import HttpClient
+from http_cache import HttpCache
+from repo_records import repo_record
+from snapshot_store import SnapshotStore, run_timestamp
+from instrumentation import instrumented, stage, timed
+
+# Long-running alternative to the nightly sweep: GitHub webhooks are applied
+# to the inventory generate_csv2 saves, so only repos an event is about are
+# looked up, and the SOC report is re-rendered shortly after a change.
+#
+#   python scripts/webhook_receiver.py                  # listen for deliveries
+#   python scripts/webhook_receiver.py --replay events.ndjson
+#
+# benchmarks/check_webhook_replay.py replays a recorded fixture against the
+# local mock API and checks the resulting inventory.
+#
+# The inventory has to be seeded once by a full generate_csv2.py run.
+
+# Configuration Section
+
+# Secret configured on the GitHub webhook; every delivery must carry its HMAC-SHA256 signature
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+
+# Changes are collected for this many seconds, then saved and rendered once
+WEBHOOK_DEBOUNCE_SECONDS = float(os.getenv("WEBHOOK_DEBOUNCE_SECONDS", "60"))
+
+HANDLED_EVENTS = ("repository", "custom_property_values", "push")
+
+# Repository actions that can change a repo's name, URL or default branch but
+# not its custom properties or Codacy status, so its row is updated in place
+REFRESH_ACTIONS = ("renamed", "edited", "archived", "unarchived", "publicized", "privatized")
+
+# Helper Functions
+
+def verify_signature(secret, body, signature):
+    """Check a GitHub X-Hub-Signature-256 header against the raw request body."""
+    if not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret, body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len("sha256="):])
+
+def github_timestamp(value):
+    """Push payloads carry pushed_at as epoch seconds; the listing and the inventory use ISO 8601."""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return value
+
+def event_repo(payload):
+    """Project the payload's repository onto a RepoRecord, like a listing entry."""
+    repository = dict(payload.get("repository") or {})
+    repository["pushed_at"] = github_timestamp(repository.get("pushed_at"))
+    org = (payload.get("organization") or {}).get("login", "")
+    return repo_record(repository, org)
+
+def refresh_row(row, repo):
+    """Carry a row's SOC and Codacy columns over to the repo's current name, URL and default branch."""
+    return [repo.name, repo.html_url, repo.default_branch] + row[3:]
+
+def changes_compliance(property_values):
+    return any(
+        (item.get("property_name") or "").strip().lower() == "compliance" for item in property_values
+    )
+
+# --------------------- Inventory State ----------------------------------
+
+class InventoryState:
+    """
+    The per-org inventories saved by generate_csv2 (one build_row result per
+    repo), loaded once and updated in place as events arrive.
+    flush() saves the changed ones and re-renders the SOC report.
+    """
+
+    def __init__(self, orgs):
+        self.orgs = {org.lower(): org for org in orgs}
+        self.inventories = {org: generate_csv2.load_inventory(org) for org in orgs}
+        self.dirty = set()
+        self.rows_changed = False
+        self.applied = 0
+        self.ignored = 0
+        self.failed = 0
+
+    def org(self, login):
+        return self.orgs.get((login or "").lower())
+
+    def get(self, org, key):
+        return self.inventories[org].get(key)
+
+    def put(self, org, key, entry):
+        previous = self.inventories[org].get(key)
+        self.inventories[org][key] = entry
+        self.dirty.add(org)
+        if (previous or {}).get("row") != entry["row"]:
+            self.rows_changed = True
+
+    def pop(self, org, key):
+        entry = self.inventories[org].pop(key, None)
+        if entry is not None:
+            self.dirty.add(org)
+            if entry["row"]:
+                self.rows_changed = True
+        return entry
+
+    def soc_rows(self):
+        rows = []
+        for org, inventory in self.inventories.items():
+            rows.extend(generate_csv2.inventory_rows(org, inventory))
+        rows.sort(key=lambda x: (x[-1].lower(), x[0].lower()))
+        return rows
+
+# --------------------- Event Handling ----------------------------------
+
+async def apply_event(client, state, event, payload):
+    """
+    Apply one webhook delivery to the inventory. Only repos the event is
+    about are looked up, and only when the payload alone cannot tell their
+    SOC or Codacy status. Returns False if the event was ignored.
+    """
+    if event not in HANDLED_EVENTS or not payload.get("repository"):
+        return False
+    repo = event_repo(payload)
+    org = state.org(repo.owner)
+    action = payload.get("action")
+
+    # A repo transferred away from an audited org leaves its inventory
+    left = None
+    if event == "repository" and action == "transferred":
+        previous_owner = (payload.get("changes") or {}).get("owner", {}).get("from", {})
+        previous_login = (previous_owner.get("organization") or previous_owner.get("user") or {}).get("login")
+        previous_org = state.org(previous_login)
+        if previous_org:
+            left = state.pop(previous_org, f"{previous_login}/{repo.name}".lower())
+    if org is None:
+        return left is not None
+
+    key = repo.full_name.lower()
+    entry = state.get(org, key)
+
+    if event == "repository":
+        if action == "deleted":
+            state.pop(org, key)
+            return True
+        if action == "renamed":
+            previous_name = (payload.get("changes") or {}).get("repository", {}).get("name", {}).get("from")
+            if previous_name:
+                entry = state.pop(org, f"{repo.owner}/{previous_name}".lower()) or entry
+        if entry is not None and action in REFRESH_ACTIONS:
+            row = refresh_row(entry["row"], repo) if entry["row"] else None
+        else:
+            row = await generate_csv2.recheck_repo(client, repo)
+
+    elif event == "custom_property_values":
+        new_values = payload.get("new_property_values") or []
+        if entry is None:
+            row = await generate_csv2.recheck_repo(client, repo)
+        elif not changes_compliance(new_values):
+            row = entry["row"]
+        elif not generate_csv2.is_soc_compliant(new_values):
+            row = None
+        elif entry["row"]:
+            row = refresh_row(entry["row"], repo)
+        else:
+            # Newly SOC: the only thing the payload cannot tell is the Codacy status
+            codacy_integrated = await timed(
+                "codacy_lookup", generate_csv2.is_codacy_project(client, repo.owner, repo.name)
+            )
+            row = generate_csv2.build_row(repo, new_values, codacy_integrated)
+
+    else:  # push: only the timestamps move; Codacy details follow the analysed commit on their own
+        row = entry["row"] if entry is not None else await generate_csv2.recheck_repo(client, repo)
+
+    state.put(org, key, generate_csv2.inventory_entry(repo, row))
+    return True
+
+async def apply_delivery(client, state, event, payload):
+    """apply_event with the outcome counted; a failing delivery is reported and skipped."""
+    try:
+        with stage("apply_events"):
+            applied = await apply_event(client, state, event, payload)
+    except Exception as e:
+        state.failed += 1
+        print(f"❌ Failed to apply {event} event: {e}")
+        return False
+    if applied:
+        state.applied += 1
+    else:
+        state.ignored += 1
+    return applied
+
+def flush(state, force=False):
+    """Save changed inventories and, if a SOC row changed (or force), re-render the SOC report."""
+    for org in state.dirty:
+        generate_csv2.save_inventory(org, state.inventories[org])
+    state.dirty.clear()
+    if not (state.rows_changed or force):
+        return False
+    state.rows_changed = False
+
+    with stage("render"):
+        rows = state.soc_rows()
+        with SnapshotStore() as store:
+            store.append_soc_rows(run_timestamp(), ",".join(state.inventories), rows)
+        if rows:
+            generate_csv2.export_to_csv(rows)
+        else:
+            print("⚠️ No SOC-compliant repositories in the inventory.")
+    print(f"🔄 Re-rendered after {state.applied} applied events ({state.ignored} ignored, {state.failed} failed)")
+    return True
+
+# --------------------- Receiver ----------------------------------
+
+class WebhookServer(ThreadingHTTPServer):
+    """HTTP server holding the webhook secret and the callback that hands deliveries to the event loop."""
+
+    daemon_threads = True
+
+    def __init__(self, address, secret, enqueue):
+        super().__init__(address, WebhookHandler)
+        self.secret = secret
+        self.enqueue = enqueue
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """
+    Accepts signed GitHub deliveries on any path and hands them to the event
+    loop through the server's enqueue; POST /render (signed the same way)
+    re-renders right away.
+    """
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            return self._send(200, {"status": "ok"})
+        return self._send(404, {"message": "Not Found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if not verify_signature(self.server.secret, body, self.headers.get("X-Hub-Signature-256")):
+            return self._send(401, {"message": "invalid signature"})
+
+        if self.path == "/render":
+            self.server.enqueue("render", None)
+            return self._send(202, {"message": "render queued"})
+
+        event = self.headers.get("X-GitHub-Event", "")
+        if event == "ping":
+            return self._send(200, {"message": "pong"})
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return self._send(400, {"message": "invalid JSON"})
+        self.server.enqueue(event, payload)
+        return self._send(202, {"message": "accepted"})
+
+    def log_message(self, format, *args):
+        pass  # deliveries are reported by the consumer
+
+async def consume(client, state, queue, debounce, record=None):
+    """
+    Apply deliveries from the queue as they arrive. The first change after a
+    render schedules the next one `debounce` seconds later, so a burst of
+    events is saved and rendered once.
+    """
+    pending_flush = None
+
+    async def delayed_flush():
+        await asyncio.sleep(debounce)
+        flush(state)
+
+    while True:
+        event, payload = await queue.get()
+        if event == "render":
+            if pending_flush is not None:
+                pending_flush.cancel()
+            flush(state, force=True)
+            continue
+
+        if record:
+            with open(record, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"event": event, "payload": payload}) + "\n")
+        if await apply_delivery(client, state, event, payload):
+            if pending_flush is None or pending_flush.done():
+                pending_flush = asyncio.create_task(delayed_flush())
+
+async def serve(host, port, debounce, record=None):
+    if not WEBHOOK_SECRET:
+        raise Exception("🚨 WEBHOOK_SECRET is not set; refusing to accept unsigned deliveries")
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def enqueue(event, payload):
+        loop.call_soon_threadsafe(queue.put_nowait, (event, payload))
+
+    httpd = WebhookServer((host, port), WEBHOOK_SECRET.encode(), enqueue)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    print(f"👂 Listening for GitHub webhooks on http://{host}:{httpd.server_address[1]}")
+
+    state = InventoryState(generate_csv2.GITHUB_ORGS)
+    try:
+        async with HttpClient(cache=HttpCache()) as client:
+            await consume(client, state, queue, debounce, record)
+    finally:
+        httpd.shutdown()
+        flush(state)
+
+async def replay(path):
+    """
+    Apply recorded deliveries ({"event": ..., "payload": ...} per line, as
+    written by --record) in order, then save and render once.
+    """
+    state = InventoryState(generate_csv2.GITHUB_ORGS)
+    async with HttpClient(cache=HttpCache()) as client:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    delivery = json.loads(line)
+                    await apply_delivery(client, state, delivery["event"], delivery["payload"])
+    print(f"📼 Replayed {state.applied + state.ignored + state.failed} deliveries from {path}")
+    if not flush(state):
+        print("✅ No SOC rows changed.")
+    print(client.stats.summary())
+    print(client.cache.summary())
+    return state
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the SOC inventory up to date from GitHub webhooks.")
+    parser.add_argument("--replay", metavar="NDJSON", help="apply recorded deliveries from a file instead of listening")
+    parser.add_argument("--record", metavar="NDJSON", help="append every received delivery to a file, for --replay")
+    parser.add_argument("--host", default=WEBHOOK_HOST)
+    parser.add_argument("--port", type=int, default=WEBHOOK_PORT)
+    parser.add_argument(
+        "--debounce", type=float, default=WEBHOOK_DEBOUNCE_SECONDS,
+        help="seconds to collect changes before saving and re-rendering"
+    )
+    args = parser.parse_args()
+
+    with instrumented("webhook_receiver"):
+        if args.replay:
+            asyncio.run(replay(args.replay))
+        else:
+            asyncio.run(serve(args.host, args.port, args.debounce, args.record))
+
+if __name__ == "__main__":
+    main()